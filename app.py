@@ -10,8 +10,9 @@ import pandas as pd
 
 from hd_calculations import (
     calculate_natal_chart,
-    calculate_transit_chart,
+    get_current_transit_chart,
     geocode_location_with_fallback,
+    suggest_locations,
     get_profile_name
 )
 from hd_bodygraph import (
@@ -282,10 +283,24 @@ if not st.session_state.chart_calculated:
             placeholder="City, Country"
         )
     
-    # Location lookup
+    # Location lookup: offer offline suggestions unless the entry names a known place
     location_data = None
     if location_input:
-        location_data = geocode_location_with_fallback(location_input)
+        location_query = location_input
+        suggestions = suggest_locations(location_input)
+        if suggestions and not suggestions[0]['exact']:
+            search_online = f'Search online for "{location_input}"'
+            options = [s['address'] for s in suggestions] + [search_online]
+            # Preselect a suggestion only if it fits everything typed, so
+            # 'Paris, Texas' is not quietly swapped for Paris, France
+            choice = st.selectbox(
+                "Did you mean",
+                options=options,
+                index=0 if suggestions[0]['agrees'] else len(options) - 1
+            )
+            if choice != search_online:
+                location_query = choice
+        location_data = geocode_location_with_fallback(location_query)
         if location_data:
             st.caption(f"✓ {location_data['address']} ({location_data['timezone']})")
         else:
@@ -408,8 +423,8 @@ else:
     
     # ============ TAB 1: DAILY PRACTICE (Transit-aware) ============
     with tab1:
-        # Calculate current transits
-        current_transit = calculate_transit_chart(datetime.now(), 'UTC')
+        # Current transits, shared across sessions until the next ingress
+        current_transit = get_current_transit_chart()
         transit_gates = current_transit['gates']
         
         # Get transit data
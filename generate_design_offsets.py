@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Generate the birth->design offset table used by hd_calculations.
+
+Samples (birth_jd - design_jd) once per day from 1800 to 2200 with the
+Newton design-date solver and stores it as float32 deviations from 88 days
+in data/design_offsets.npz. Cubic interpolation over this grid reproduces
+the solver to well under a second.
+"""
+
+import sys
+from datetime import datetime
+
+import numpy as np
+
+from hd_calculations import (
+    DESIGN_OFFSET_TABLE_PATH,
+    calculate_design_dates,
+    datetime_to_julian
+)
+
+START = datetime(1800, 1, 1)
+END = datetime(2200, 1, 1)
+STEP_DAYS = 1.0
+# Extra samples on both sides so the 4-point interpolation covers START..END
+PADDING = 3
+CHUNK = 10000
+
+
+def build_offsets(start_jd, count, step):
+    birth_jds = start_jd + step * np.arange(count)
+    offsets = np.empty(count)
+    for i in range(0, count, CHUNK):
+        chunk = birth_jds[i:i + CHUNK]
+        offsets[i:i + CHUNK] = chunk - calculate_design_dates(chunk, method='newton', tolerance=1e-7)
+        print(f"{min(i + CHUNK, count)}/{count}", file=sys.stderr)
+    return offsets
+
+
+def main(path=DESIGN_OFFSET_TABLE_PATH):
+    start_jd = datetime_to_julian(START) - PADDING * STEP_DAYS
+    end_jd = datetime_to_julian(END) + PADDING * STEP_DAYS
+    count = int(round((end_jd - start_jd) / STEP_DAYS)) + 1
+    
+    offsets = build_offsets(start_jd, count, STEP_DAYS)
+    
+    np.savez_compressed(
+        path,
+        start_jd=np.float64(start_jd),
+        step=np.float64(STEP_DAYS),
+        base=np.float64(88.0),
+        offsets=(offsets - 88.0).astype(np.float32)
+    )
+    print(f"Wrote {count} offsets to {path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
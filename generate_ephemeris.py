@@ -3,6 +3,9 @@
 Generate ephemeris data tables from JPL Horizons API for embedding in Swift.
 This fetches geocentric ecliptic longitudes for all planets at regular intervals.
 Output is Swift code with embedded lookup tables.
+
+With --chebyshev [path] the Swift tables are instead exported from the
+local Chebyshev ephemeris built by hd_chebyshev.py (no network needed).
 """
 
 import requests
@@ -130,7 +133,89 @@ def generate_swift_table(planet_name, data):
     return "\n".join(lines)
 
 
+def swift_name(planet_name):
+    """'North Node' -> 'northNode'."""
+    words = planet_name.split()
+    return words[0].lower() + "".join(word.capitalize() for word in words[1:])
+
+
+def generate_swift_chebyshev(path=None):
+    """Print a Swift file with Chebyshev segment coefficients and a Clenshaw evaluator."""
+    from hd_chebyshev import CHEBYSHEV_EPHEMERIS_PATH, ChebyshevEphemeris
+    
+    ephemeris = ChebyshevEphemeris(path or CHEBYSHEV_EPHEMERIS_PATH)
+    
+    print("// ChebyshevEphemerisData.swift")
+    print("// Auto-generated from the Chebyshev ephemeris (hd_chebyshev.py)")
+    print(f"// Data range: JD {ephemeris.start_jd} - {ephemeris.end_jd}")
+    print("// DO NOT EDIT - regenerate using generate_ephemeris.py --chebyshev")
+    print("")
+    print("import Foundation")
+    print("")
+    print("/// Geocentric ecliptic longitudes as per-body Chebyshev segments")
+    print("struct ChebyshevEphemerisData {")
+    print("")
+    print(f"    static let startJD: Double = {ephemeris.start_jd!r}")
+    print(f"    static let endJD: Double = {ephemeris.end_jd!r}")
+    print("")
+    
+    for planet_name in ephemeris.bodies:
+        coeffs = ephemeris.coeffs[planet_name]
+        name = swift_name(planet_name)
+        max_error = ephemeris.max_error[planet_name] * 3600
+        print(f"    // {planet_name}: {coeffs.shape[0]} segments x {coeffs.shape[1]} coefficients, "
+              f"max error {max_error:.3f} arcsec")
+        print(f"    static let {name}SegmentDays: Double = {ephemeris.segment_days[planet_name]!r}")
+        print(f"    static let {name}Coefficients: Int = {coeffs.shape[1]}")
+        print(f"    static let {name}Data: [Double] = [")
+        for i, segment in enumerate(coeffs.tolist()):
+            comma = "," if i < len(coeffs) - 1 else ""
+            print("        " + ", ".join(f"{c!r}" for c in segment) + comma)
+        print("    ]")
+        print("")
+    
+    cases = "\n".join(
+        f"        case .{swift_name(planet_name)}: return evaluate(data: {swift_name(planet_name)}Data, "
+        f"coefficients: {swift_name(planet_name)}Coefficients, segmentDays: {swift_name(planet_name)}SegmentDays, jd: jd)"
+        for planet_name in ephemeris.bodies
+    )
+    print("""
+    /// Evaluate one segment's Chebyshev series with Clenshaw's recurrence
+    static func evaluate(data: [Double], coefficients: Int, segmentDays: Double, jd: Double) -> Double {
+        let segments = data.count / coefficients
+        let position = (jd - startJD) / segmentDays
+        let index = min(max(Int(position), 0), segments - 1)
+        let x = 2 * (position - Double(index)) - 1
+        let base = index * coefficients
+        
+        var b1 = 0.0
+        var b2 = 0.0
+        for k in stride(from: coefficients - 1, to: 0, by: -1) {
+            let b0 = 2 * x * b1 - b2 + data[base + k]
+            b2 = b1
+            b1 = b0
+        }
+        var result = (x * b1 - b2 + data[base]).truncatingRemainder(dividingBy: 360)
+        if result < 0 { result += 360 }
+        return result
+    }
+    
+    /// Get longitude for a planet at a given Julian Date
+    static func longitude(planet: Planet, jd: Double) -> Double {
+        switch planet {
+""" + cases + """
+        case .southNode: return (longitude(planet: .northNode, jd: jd) + 180).truncatingRemainder(dividingBy: 360)
+        case .earth: return (longitude(planet: .sun, jd: jd) + 180).truncatingRemainder(dividingBy: 360)
+        }
+    }
+}""")
+
+
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--chebyshev":
+        generate_swift_chebyshev(*sys.argv[2:3])
+        return
+    
     # Date range: 1920 to 2060 (140 years)
     start_year = 1920
     end_year = 2060
@@ -0,0 +1,238 @@
+"""
+Gate/line ingress almanac.
+
+Every line boundary crossing of every body from 1900 to 2100, solved with
+hd_calculations.find_longitude_crossings and stored per body as a sorted
+float64 array of JDs plus the int32 line index (0-383 from the wheel
+start) entered at each of them. The first entry is the state at the
+start of the range. A gate.line lookup is then one binary search per
+body, with no ephemeris call and exact boundary placement (to the solver
+tolerance), which is all most chart workloads need.
+
+Earth and the South Node are derived from the Sun and North Node: their
+line index is always 192 lines (180 degrees) further round the wheel.
+
+Build locally with:
+    python hd_almanac.py [path]
+"""
+
+import os
+import sys
+from bisect import bisect_right
+from datetime import datetime
+
+import numpy as np
+import pytz
+
+from hd_calculations import (
+    BODY_NAMES, OPPOSITE_BODIES, PLANETS, calculate_design_date, calculate_gates,
+    calculate_gates_batch, calculate_planetary_positions, calculate_planetary_positions_batch,
+    datetime_to_julian, design_dates_from_table, find_longitude_crossings, get_planet_position
+)
+from hd_gates import GATE_ORDER, GATE_SIZE, GATE_WHEEL_START
+
+ALMANAC_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'data', 'gate_almanac.npz'
+)
+
+ALMANAC_START = datetime(1900, 1, 1)
+ALMANAC_END = datetime(2100, 1, 1)
+
+LINE_SIZE = GATE_SIZE / 6
+LINES_PER_WHEEL = 384
+OPPOSITE_LINES = LINES_PER_WHEEL // 2
+# Solved in chunks so progress can be reported during the build
+CHUNK_DAYS = 3652.5
+TIME_TOLERANCE = 1e-7
+
+_GATE_ORDER_LIST = GATE_ORDER.tolist()
+
+
+def _key(name):
+    return name.lower().replace(' ', '_')
+
+
+def line_index(longitude):
+    """Line index 0-383 counted from the wheel start."""
+    return int(((longitude - GATE_WHEEL_START) % 360.0) / LINE_SIZE) % LINES_PER_WHEEL
+
+
+def line_index_to_gate_line(index):
+    """(gate, line) for line indices; works for scalars and arrays."""
+    return GATE_ORDER[index // 6], index % 6 + 1
+
+
+def build_body(body, start_jd, end_jd):
+    """Crossing JDs and entered line indices for one body."""
+    planet_id = PLANETS[body]
+    boundaries = [(GATE_WHEEL_START + k * LINE_SIZE) % 360.0 for k in range(LINES_PER_WHEEL)]
+    jds = [start_jd]
+    lines = [line_index(get_planet_position(start_jd, planet_id))]
+
+    chunk_start = start_jd
+    while chunk_start < end_jd:
+        chunk_end = min(chunk_start + CHUNK_DAYS, end_jd)
+        for jd, boundary, direction in find_longitude_crossings(
+                body, boundaries, chunk_start, chunk_end, TIME_TOLERANCE):
+            k = round(((boundary - GATE_WHEEL_START) % 360.0) / LINE_SIZE)
+            jds.append(jd)
+            lines.append((k if direction > 0 else k - 1) % LINES_PER_WHEEL)
+        chunk_start = chunk_end
+        print(f"{body}: {len(jds) - 1} crossings to JD {chunk_end:.1f}", file=sys.stderr)
+
+    return np.array(jds, dtype=np.float64), np.array(lines, dtype=np.int32)
+
+
+def build_almanac(path=ALMANAC_PATH, start=ALMANAC_START, end=ALMANAC_END):
+    start_jd = datetime_to_julian(start)
+    end_jd = datetime_to_julian(end)
+    arrays = {
+        'start_jd': np.float64(start_jd),
+        'end_jd': np.float64(end_jd),
+    }
+    for body in PLANETS:
+        jds, lines = build_body(body, start_jd, end_jd)
+        arrays[f'{_key(body)}_jds'] = jds
+        arrays[f'{_key(body)}_lines'] = lines
+    np.savez(path, **arrays)
+    return path
+
+
+class GateAlmanac:
+    """Gate/line lookups from a file written by build_almanac."""
+
+    def __init__(self, path=ALMANAC_PATH):
+        with np.load(path) as data:
+            self.path = path
+            self.start_jd = float(data['start_jd'])
+            self.end_jd = float(data['end_jd'])
+            self.jds = {}
+            self.lines = {}
+            for body in PLANETS:
+                self.jds[body] = data[f'{_key(body)}_jds']
+                self.lines[body] = data[f'{_key(body)}_lines']
+
+    def covers(self, jd):
+        return self.start_jd <= jd <= self.end_jd
+
+    def _check_range(self, jds):
+        if np.min(jds) < self.start_jd or np.max(jds) > self.end_jd:
+            raise ValueError("Julian day outside the almanac range")
+
+    def _source_indices(self, jds, body):
+        i = np.searchsorted(self.jds[body], jds, side='right') - 1
+        return self.lines[body][i]
+
+    def line_indices(self, jds, body):
+        """Line index of `body` for a scalar JD or an array of JDs."""
+        self._check_range(jds)
+        source = OPPOSITE_BODIES.get(body, body)
+        indices = self._source_indices(jds, source)
+        if source != body:
+            indices = (indices + OPPOSITE_LINES) % LINES_PER_WHEEL
+        return indices
+
+    def gates(self, jd):
+        """Same shape as calculate_gates, without the longitude and sub-line fields."""
+        if not self.covers(jd):
+            raise ValueError("Julian day outside the almanac range")
+        # bisect on the arrays avoids NumPy call overhead for a single JD
+        indices = {
+            body: int(self.lines[body][bisect_right(self.jds[body], jd) - 1])
+            for body in PLANETS
+        }
+        for body, source in OPPOSITE_BODIES.items():
+            indices[body] = (indices[source] + OPPOSITE_LINES) % LINES_PER_WHEEL
+        gates = {}
+        for body in BODY_NAMES:
+            index = indices[body]
+            gates[body] = {'gate': _GATE_ORDER_LIST[index // 6], 'line': index % 6 + 1}
+        return gates
+
+    def gates_batch(self, jds):
+        """(N, 13) gate and line arrays in BODY_NAMES order, like calculate_gates_batch."""
+        jds = np.atleast_1d(np.asarray(jds, dtype=float))
+        self._check_range(jds)
+        indices = np.empty((len(jds), len(BODY_NAMES)), dtype=np.int32)
+        for col, body in enumerate(BODY_NAMES):
+            if body in OPPOSITE_BODIES:
+                source_col = BODY_NAMES.index(OPPOSITE_BODIES[body])
+                indices[:, col] = (indices[:, source_col] + OPPOSITE_LINES) % LINES_PER_WHEEL
+            else:
+                indices[:, col] = self._source_indices(jds, body)
+        gates, lines = line_index_to_gate_line(indices)
+        return gates, lines.astype(np.int8)
+
+
+_ALMANAC = None
+
+
+def get_almanac(path=ALMANAC_PATH):
+    """The process-wide almanac, loaded on first use."""
+    global _ALMANAC
+    if _ALMANAC is None or _ALMANAC.path != path:
+        _ALMANAC = GateAlmanac(path)
+    return _ALMANAC
+
+
+def chart_gates(jd):
+    """
+    Gate/line of every body at a JD: from the almanac when it exists and
+    covers the JD, otherwise from the ephemeris.
+    """
+    try:
+        almanac = get_almanac()
+    except OSError:
+        almanac = None
+    if almanac is not None and almanac.covers(jd):
+        return almanac.gates(jd)
+    gates = calculate_gates(calculate_planetary_positions(jd))
+    return {body: {'gate': data['gate'], 'line': data['line']} for body, data in gates.items()}
+
+
+def chart_gates_batch(jds):
+    """
+    (N, 13) gate and line arrays in BODY_NAMES order: from the almanac
+    when it exists and covers every JD, otherwise from the ephemeris backend.
+    """
+    jds = np.atleast_1d(np.asarray(jds, dtype=float))
+    try:
+        almanac = get_almanac()
+    except OSError:
+        almanac = None
+    if almanac is not None and almanac.covers(jds.min()) and almanac.covers(jds.max()):
+        return almanac.gates_batch(jds)
+    return calculate_gates_batch(calculate_planetary_positions_batch(jds))
+
+
+def natal_chart_gates(birth_datetime, timezone_str='UTC'):
+    """
+    Gate/line-only counterpart of calculate_natal_chart. Within the offset
+    table and almanac ranges (1900-2100) no ephemeris call is made.
+    """
+    birth_jd = datetime_to_julian(birth_datetime, timezone_str)
+    design_jd = design_dates_from_table(birth_jd)
+    if np.isnan(design_jd):
+        design_jd = calculate_design_date(birth_jd)
+    return {
+        'birth_jd': birth_jd,
+        'design_jd': design_jd,
+        'personality': chart_gates(birth_jd),
+        'design': chart_gates(design_jd)
+    }
+
+
+def transit_gates(transit_datetime=None):
+    """Gate/line-only counterpart of calculate_transit_chart."""
+    if transit_datetime is None:
+        transit_datetime = datetime.now(pytz.UTC)
+    return chart_gates(datetime_to_julian(transit_datetime, 'UTC'))
+
+
+def main(path=ALMANAC_PATH):
+    build_almanac(path)
+    print(f"Wrote {path} ({os.path.getsize(path) / 1e6:.1f} MB)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
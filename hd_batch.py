@@ -0,0 +1,297 @@
+"""
+Bulk chart calculation from a file of birth records.
+
+    python hd_batch.py births.csv charts.jsonl
+    python hd_batch.py births.jsonl charts.parquet --workers 8
+
+Input is CSV (with a header row) or JSON Lines, one birth per record
+with the fields:
+
+    id         optional, copied to the output
+    date       YYYY-MM-DD, local
+    time       HH:MM or HH:MM:SS, local
+    timezone   IANA name, e.g. Europe/Athens
+    location   place name, geocoded when no timezone is given
+
+Records stream through a generator pipeline in fixed-size batches:
+parse, resolve timezones (each distinct location is geocoded once per
+run), compute charts in a process pool, write. Only a bounded number of
+batches is in flight at a time, so memory does not grow with the input.
+Output is JSON Lines, or Parquet when the output name ends in .parquet
+and pyarrow is installed; both are written incrementally, batch by batch.
+Records that cannot be computed are written with an 'error' field
+instead of being dropped.
+
+Each batch is computed with the array counterparts of
+calculate_natal_chart and analyze_chart: design dates from
+calculate_design_dates, gate/line activations from the almanac
+(hd_almanac.chart_gates_batch, ephemeris outside its range) and
+analyze_charts_batch.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import deque
+from datetime import datetime
+from multiprocessing import Pool
+
+import numpy as np
+import pytz
+
+from hd_almanac import chart_gates_batch
+from hd_bodygraph import CENTER_NAMES, CHANNEL_KEYS, analyze_charts_batch
+from hd_calculations import (
+    BODY_NAMES, UNIX_EPOCH_JD, calculate_design_dates, datetimes_to_julian, geocode_location_with_fallback
+)
+
+BATCH_SIZE = 2000
+
+BODY_COLUMNS = [name.lower().replace(' ', '_') for name in BODY_NAMES]
+COLUMNS = (
+    ['id', 'birth_utc', 'timezone', 'type', 'authority', 'profile', 'definition',
+     'incarnation_cross', 'defined_centers', 'defined_channels']
+    + [f'personality_{body}' for body in BODY_COLUMNS]
+    + [f'design_{body}' for body in BODY_COLUMNS]
+    + ['error']
+)
+
+_SUN = BODY_NAMES.index('Sun')
+_EARTH = BODY_NAMES.index('Earth')
+
+
+# ============ INPUT ============
+
+def read_records(path):
+    """Yield input records as dicts, from CSV or JSON Lines by file extension."""
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith(('.jsonl', '.ndjson', '.json')):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def parse_birth_time(record):
+    """Naive local birth datetime from the record's date and time fields."""
+    date = str(record.get('date') or '').strip()
+    time = str(record.get('time') or '').strip()
+    if not date or not time:
+        raise ValueError("Record needs date and time")
+    time_format = '%H:%M:%S' if time.count(':') == 2 else '%H:%M'
+    return datetime.strptime(f'{date} {time}', f'%Y-%m-%d {time_format}')
+
+
+class TimezoneResolver:
+    """Timezone of a record, geocoding each distinct location only once."""
+
+    def __init__(self, geocode=geocode_location_with_fallback):
+        self._geocode = geocode
+        self._cache = {}
+        self.lookups = 0
+
+    def resolve(self, record):
+        timezone_str = (record.get('timezone') or '').strip()
+        if timezone_str:
+            pytz.timezone(timezone_str)
+            return timezone_str
+        location = (record.get('location') or '').strip()
+        if not location:
+            raise ValueError("Record needs a timezone or a location")
+        key = ' '.join(location.lower().split())
+        if key not in self._cache:
+            self.lookups += 1
+            result = self._geocode(location)
+            self._cache[key] = result['timezone'] if result else None
+        if self._cache[key] is None:
+            raise ValueError(f"Could not geocode location: {location}")
+        return self._cache[key]
+
+
+def prepared_batches(records, resolver, batch_size=BATCH_SIZE):
+    """
+    Group records into batches of (id, local datetime, timezone, error)
+    tuples; records that fail to parse or resolve carry their error.
+    """
+    batch = []
+    for number, record in enumerate(records):
+        record_id = str(record.get('id') or number)
+        try:
+            item = (record_id, parse_birth_time(record), resolver.resolve(record), None)
+        except (ValueError, pytz.UnknownTimeZoneError) as e:
+            item = (record_id, None, None, f'{type(e).__name__}: {e}')
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ============ COMPUTATION ============
+
+def _error_row(record_id, timezone_str, error):
+    row = dict.fromkeys(COLUMNS)
+    row.update({'id': record_id, 'timezone': timezone_str, 'error': error})
+    return row
+
+
+def compute_batch(batch):
+    """Output rows (dicts keyed by COLUMNS) for one prepared batch, in order."""
+    rows = [None] * len(batch)
+    valid = []
+    for i, (record_id, birth, timezone_str, error) in enumerate(batch):
+        if error is None:
+            valid.append(i)
+        else:
+            rows[i] = _error_row(record_id, timezone_str, error)
+    if not valid:
+        return rows
+
+    birth_jds = datetimes_to_julian([batch[i][1] for i in valid], [batch[i][2] for i in valid])
+    design_jds = calculate_design_dates(birth_jds)
+    personality_gates, personality_lines = chart_gates_batch(birth_jds)
+    design_gates, design_lines = chart_gates_batch(design_jds)
+    gates = np.hstack([personality_gates, design_gates])
+    lines = np.hstack([personality_lines, design_lines])
+    analysis = analyze_charts_batch(gates, lines)
+    half = len(BODY_NAMES)
+
+    utc_seconds = np.rint((birth_jds - UNIX_EPOCH_JD) * 86400).astype(np.int64)
+    birth_utc = np.char.add(np.datetime_as_string(utc_seconds.astype('datetime64[s]')), '+00:00').tolist()
+    activations = np.char.add(np.char.add(gates.astype(str), '.'), lines.astype(str)).tolist()
+    gates = gates.tolist()
+    for row_index, i in enumerate(valid):
+        g = gates[row_index]
+        row = {
+            'id': batch[i][0],
+            'birth_utc': birth_utc[row_index],
+            'timezone': batch[i][2],
+            'type': analysis['type'][row_index],
+            'authority': analysis['authority'][row_index],
+            'profile': analysis['profile'][row_index],
+            'definition': analysis['definition'][row_index],
+            'incarnation_cross': f"{g[_SUN]}/{g[_EARTH]} | {g[half + _SUN]}/{g[half + _EARTH]}",
+            'defined_centers': [CENTER_NAMES[c] for c in np.flatnonzero(analysis['defined_centers'][row_index])],
+            'defined_channels': [CHANNEL_KEYS[c] for c in np.flatnonzero(analysis['defined_channels'][row_index])],
+            'error': None
+        }
+        values = activations[row_index]
+        for col, body in enumerate(BODY_COLUMNS):
+            row[f'personality_{body}'] = values[col]
+            row[f'design_{body}'] = values[half + col]
+        rows[i] = row
+    return rows
+
+
+def _compute_ordered(batches, workers):
+    """compute_batch over batches, in order, with at most 2 * workers batches in flight."""
+    if workers == 1:
+        yield from map(compute_batch, batches)
+        return
+    with Pool(workers) as pool:
+        pending = deque()
+        for batch in batches:
+            pending.append(pool.apply_async(compute_batch, (batch,)))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+# ============ OUTPUT ============
+
+class JsonlWriter:
+    def __init__(self, path):
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write(self, rows):
+        for row in rows:
+            self._file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    """Appends each batch as a row group of one Parquet file (needs pyarrow)."""
+
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet output needs pyarrow: pip install pyarrow") from None
+        self._pa = pa
+        list_columns = {'defined_centers', 'defined_channels'}
+        self._schema = pa.schema([
+            (name, pa.list_(pa.string()) if name in list_columns else pa.string())
+            for name in COLUMNS
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, rows):
+        columns = {name: [row[name] for row in rows] for name in COLUMNS}
+        self._writer.write_table(self._pa.Table.from_pydict(columns, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+def open_writer(path):
+    if path.endswith('.parquet'):
+        return ParquetWriter(path)
+    return JsonlWriter(path)
+
+
+# ============ PIPELINE ============
+
+def run_batch(input_path, output_path, workers=None, batch_size=BATCH_SIZE,
+              geocode=geocode_location_with_fallback):
+    """
+    Stream input_path through the pipeline into output_path.
+
+    geocode maps a location string to a dict with a 'timezone' (or None),
+    like geocode_location_with_fallback. Returns counts of records
+    written, failed and distinct locations geocoded.
+    """
+    workers = workers or os.cpu_count() or 1
+    resolver = TimezoneResolver(geocode)
+    batches = prepared_batches(read_records(input_path), resolver, batch_size)
+    writer = open_writer(output_path)
+    written = failed = 0
+    try:
+        for rows in _compute_ordered(batches, workers):
+            writer.write(rows)
+            written += len(rows)
+            failed += sum(row['error'] is not None for row in rows)
+            print(f"{written} records", file=sys.stderr)
+    finally:
+        writer.close()
+    return {'records': written, 'errors': failed, 'geocoded_locations': resolver.lookups}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='hd-batch', description="Bulk natal charts from a CSV/JSONL of birth records"
+    )
+    parser.add_argument('input', help="CSV or JSONL file of birth records")
+    parser.add_argument('output', help="JSONL output, or .parquet (needs pyarrow)")
+    parser.add_argument('--workers', type=int, help="worker processes (default: all CPUs)")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="records per batch")
+    args = parser.parse_args(argv)
+
+    summary = run_batch(args.input, args.output, args.workers, args.batch_size)
+    print(
+        f"{summary['records']} records ({summary['errors']} errors, "
+        f"{summary['geocoded_locations']} locations geocoded) -> {args.output}",
+        file=sys.stderr
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Birth-time-unknown mode.
+
+Splits a window of possible birth times into the exact intervals over
+which the chart is constant. A chart only changes when a body changes
+line, either at birth (personality) or at the design date (design), so
+the interval boundaries are:
+
+- personality ingresses inside the window, from hd_ingress;
+- design ingresses between the design dates of the window's two ends,
+  mapped back to the birth time whose Sun is 88 degrees ahead of the
+  Sun at that design ingress.
+
+One chart and analysis is computed per interval instead of one per
+sampled minute.
+"""
+
+from datetime import datetime, timedelta
+
+import pytz
+import swisseph as swe
+
+from hd_bodygraph import analyze_chart
+from hd_calculations import (
+    calculate_design_date, calculate_natal_chart, datetime_to_julian,
+    find_longitude_crossings, get_planet_position, julian_to_datetime
+)
+from hd_ingress import find_ingresses
+
+# Fields that make two neighbouring intervals the "same" chart for grouping
+CHART_FIELDS = ('type', 'authority', 'profile', 'definition')
+
+# Events closer than this (days, ~0.01 s) are treated as simultaneous
+EVENT_TOLERANCE = 1e-7
+
+
+def design_to_birth_jd(design_jd):
+    """Birth JD whose design date is design_jd: the Sun has moved 88 degrees on."""
+    target = (get_planet_position(design_jd, swe.SUN) + 88.0) % 360.0
+    crossings = find_longitude_crossings('Sun', target, design_jd + 60, design_jd + 120)
+    return crossings[0][0]
+
+
+def chart_events(start_jd, end_jd):
+    """Birth JDs in (start_jd, end_jd) at which any personality or design line changes."""
+    events = []
+    for event in find_ingresses(start_jd, end_jd, level='line'):
+        events.append((event['jd'], 'personality', event))
+
+    design_start = calculate_design_date(start_jd)
+    design_end = calculate_design_date(end_jd)
+    for event in find_ingresses(design_start, design_end, level='line'):
+        events.append((design_to_birth_jd(event['jd']), 'design', event))
+
+    events = [item for item in events if start_jd < item[0] < end_jd]
+    events.sort(key=lambda item: item[0])
+    return events
+
+
+def find_chart_intervals(start, end, timezone_str='UTC'):
+    """
+    Every interval of birth times in [start, end] with a constant chart.
+
+    start and end are datetimes, localized in timezone_str when naive.
+    Returns a list of dicts with the interval's local 'start'/'end'
+    datetimes and JDs, the 'changes' that open it (empty for the first),
+    and the 'chart' and 'analysis' that hold throughout.
+    """
+    tz = pytz.timezone(timezone_str)
+    start_jd = datetime_to_julian(start, timezone_str)
+    end_jd = datetime_to_julian(end, timezone_str)
+    if end_jd <= start_jd:
+        raise ValueError("Birth-time window must end after it starts")
+
+    # Group simultaneous events (e.g. Sun and Earth) into one boundary
+    boundaries = []
+    for jd, side, event in chart_events(start_jd, end_jd):
+        change = {'side': side, 'body': event['body'], 'gate': event['gate'], 'line': event['line']}
+        if boundaries and jd - boundaries[-1][0] < EVENT_TOLERANCE:
+            boundaries[-1][1].append(change)
+        else:
+            boundaries.append((jd, [change]))
+
+    edges = [(start_jd, [])] + boundaries + [(end_jd, None)]
+    intervals = []
+    for (jd0, changes), (jd1, _) in zip(edges, edges[1:]):
+        middle = julian_to_datetime((jd0 + jd1) / 2)
+        chart = calculate_natal_chart(middle, 'UTC')
+        intervals.append({
+            'start': julian_to_datetime(jd0).astimezone(tz),
+            'end': julian_to_datetime(jd1).astimezone(tz),
+            'start_jd': jd0,
+            'end_jd': jd1,
+            'changes': changes,
+            'chart': chart,
+            'analysis': analyze_chart(chart)
+        })
+    return intervals
+
+
+def find_day_intervals(birth_date, timezone_str='UTC'):
+    """find_chart_intervals over a whole local calendar day."""
+    start = datetime(birth_date.year, birth_date.month, birth_date.day)
+    return find_chart_intervals(start, start + timedelta(days=1), timezone_str)
+
+
+def group_intervals(intervals, fields=CHART_FIELDS):
+    """
+    Merge neighbouring intervals that agree on `fields` of the analysis.
+
+    Returns the distinct "possible charts" for display: dicts with the
+    merged start/end, the shared field values, and the intervals merged.
+    """
+    groups = []
+    for interval in intervals:
+        values = {field: interval['analysis'][field] for field in fields}
+        if groups and groups[-1]['values'] == values:
+            groups[-1]['end'] = interval['end']
+            groups[-1]['end_jd'] = interval['end_jd']
+            groups[-1]['intervals'].append(interval)
+        else:
+            groups.append({
+                'start': interval['start'],
+                'end': interval['end'],
+                'start_jd': interval['start_jd'],
+                'end_jd': interval['end_jd'],
+                'values': values,
+                'intervals': [interval]
+            })
+    return groups
@@ -1,3 +1,5 @@
+import numpy as np
+
 CENTERS = {
     'Head': {
         'gates': [64, 61, 63],
@@ -99,6 +101,200 @@ for center_name, center_data in CENTERS.items():
     for gate in center_data['gates']:
         GATE_TO_CENTER[gate] = center_name
 
+# ============ BITMASKS ============
+# Gate g is bit g - 1 of a gate mask; channels and centers are bits in
+# CHANNELS and CENTERS order. Byte-indexed tables turn "which channels are
+# complete" and "which centers do these channels define" into a few
+# lookups and ORs per chart.
+
+CHANNEL_KEYS = list(CHANNELS)
+CENTER_NAMES = list(CENTERS)
+CENTER_BITS = {name: 1 << i for i, name in enumerate(CENTER_NAMES)}
+MOTOR_MASK = (CENTER_BITS['Sacral'] | CENTER_BITS['Heart']
+              | CENTER_BITS['Solar Plexus'] | CENTER_BITS['Root'])
+
+def gate_mask(gates):
+    mask = 0
+    for gate in gates:
+        mask |= 1 << (gate - 1)
+    return mask
+
+def _bits(mask):
+    index = 0
+    while mask:
+        if mask & 1:
+            yield index
+        mask >>= 1
+        index += 1
+
+def _byte_tables(item_masks):
+    # tables[k][b] is the OR of item_masks[8k + j] over the set bits j of b
+    tables = []
+    for k in range(0, len(item_masks), 8):
+        items = item_masks[k:k + 8]
+        table = [0] * 256
+        for byte in range(1, 256):
+            low = byte & -byte
+            bit = low.bit_length() - 1
+            table[byte] = table[byte ^ low] | (items[bit] if bit < len(items) else 0)
+        tables.append(table)
+    return tables
+
+def _lookup(tables, mask):
+    result = 0
+    for table in tables:
+        result |= table[mask & 0xFF]
+        mask >>= 8
+    return result
+
+CHANNEL_CENTER_MASKS = [
+    CENTER_BITS[channel['centers'][0]] | CENTER_BITS[channel['centers'][1]]
+    for channel in CHANNELS.values()
+]
+
+# A channel is complete when both its first and its second gate are active
+_FIRST_GATE_CHANNELS = _byte_tables([
+    sum(1 << i for i, channel in enumerate(CHANNELS.values()) if channel['gates'][0] == gate)
+    for gate in range(1, 65)
+])
+_SECOND_GATE_CHANNELS = _byte_tables([
+    sum(1 << i for i, channel in enumerate(CHANNELS.values()) if channel['gates'][1] == gate)
+    for gate in range(1, 65)
+])
+_CHANNEL_CENTERS = _byte_tables(CHANNEL_CENTER_MASKS)
+
+def channel_mask(gates_mask):
+    return _lookup(_FIRST_GATE_CHANNELS, gates_mask) & _lookup(_SECOND_GATE_CHANNELS, gates_mask)
+
+def center_mask(channels_mask):
+    return _lookup(_CHANNEL_CENTERS, channels_mask)
+
+def channels_from_mask(channels_mask):
+    return [CHANNEL_KEYS[i] for i in _bits(channels_mask)]
+
+def centers_from_mask(centers_mask):
+    return [CENTER_NAMES[i] for i in _bits(centers_mask)]
+
+# ============ CENTER CONNECTIVITY ============
+# The 36 channels join only 17 distinct pairs of centers. Connectivity is
+# a property of the set of joined pairs (the edge mask), so components are
+# worked out once per edge mask with union-find and memoized.
+
+CENTER_EDGES = []
+for channel in CHANNELS.values():
+    edge = tuple(sorted(CENTER_NAMES.index(center) for center in channel['centers']))
+    if edge not in CENTER_EDGES:
+        CENTER_EDGES.append(edge)
+CHANNEL_EDGE_MASKS = [
+    1 << CENTER_EDGES.index(tuple(sorted(CENTER_NAMES.index(center) for center in channel['centers'])))
+    for channel in CHANNELS.values()
+]
+_CHANNEL_EDGES = _byte_tables(CHANNEL_EDGE_MASKS)
+
+def edge_mask(channels_mask):
+    return _lookup(_CHANNEL_EDGES, channels_mask)
+
+_COMPONENTS = {}
+
+def center_components(edges_mask):
+    """Connected groups of centers (as center masks) for an edge mask, memoized."""
+    components = _COMPONENTS.get(edges_mask)
+    if components is None:
+        parent = list(range(len(CENTER_NAMES)))
+        
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+        
+        edges = [CENTER_EDGES[i] for i in _bits(edges_mask)]
+        for a, b in edges:
+            root_a, root_b = find(a), find(b)
+            if root_a != root_b:
+                parent[root_a] = root_b
+        groups = {}
+        for edge in edges:
+            for center in edge:
+                root = find(center)
+                groups[root] = groups.get(root, 0) | (1 << center)
+        components = tuple(groups.values())
+        _COMPONENTS[edges_mask] = components
+    return components
+
+def _type_from_masks(centers, components):
+    # A motor anywhere in the Throat's group connects it, however long the chain
+    throat = CENTER_BITS['Throat']
+    throat_connected_to_motor = any(
+        group & throat and group & MOTOR_MASK for group in components
+    )
+    
+    if centers & CENTER_BITS['Sacral']:
+        if throat_connected_to_motor:
+            return "Manifesting Generator"
+        return "Generator"
+    elif throat_connected_to_motor:
+        return "Manifestor"
+    elif centers:
+        return "Projector"
+    else:
+        return "Reflector"
+
+AUTHORITY_ORDER = [
+    ('Solar Plexus', "Emotional"),
+    ('Sacral', "Sacral"),
+    ('Spleen', "Splenic"),
+    ('Heart', "Ego"),
+    ('G', "Self-Projected"),
+]
+
+def _authority_from_masks(hd_type, centers):
+    if hd_type == "Reflector":
+        return "Lunar"
+    for center, authority in AUTHORITY_ORDER:
+        if centers & CENTER_BITS[center]:
+            return authority
+    if centers & (CENTER_BITS['Ajna'] | CENTER_BITS['Head']):
+        return "Mental (Outer Authority)"
+    return "None (Outer Authority)"
+
+DEFINITION_NAMES = {
+    0: "No Definition",
+    1: "Single Definition",
+    2: "Split Definition",
+    3: "Triple Split"
+}
+
+def _definition_from_masks(centers, components):
+    connected = 0
+    for group in components:
+        connected |= group
+    # Centers defined without a channel (only via the legacy helpers) stand alone
+    groups = len(components) + bin(centers & ~connected).count('1')
+    return DEFINITION_NAMES.get(groups, "Quadruple Split")
+
+# Type, authority and definition depend only on the defined channels
+_CHANNEL_ANALYSIS = {}
+CHANNEL_ANALYSIS_CACHE_SIZE = 1_000_000
+
+def analyze_channel_mask(channels_mask):
+    """(centers_mask, type, authority, definition) for a defined-channel mask, memoized."""
+    cached = _CHANNEL_ANALYSIS.get(channels_mask)
+    if cached is None:
+        centers = center_mask(channels_mask)
+        components = center_components(edge_mask(channels_mask))
+        hd_type = _type_from_masks(centers, components)
+        cached = (
+            centers,
+            hd_type,
+            _authority_from_masks(hd_type, centers),
+            _definition_from_masks(centers, components)
+        )
+        if len(_CHANNEL_ANALYSIS) >= CHANNEL_ANALYSIS_CACHE_SIZE:
+            _CHANNEL_ANALYSIS.clear()
+        _CHANNEL_ANALYSIS[channels_mask] = cached
+    return cached
+
 def find_channel_for_gates(gate1, gate2):
     key1 = f"{min(gate1, gate2)}-{max(gate1, gate2)}"
     if key1 in CHANNELS:
@@ -106,15 +302,7 @@ def find_channel_for_gates(gate1, gate2):
     return None
 
 def get_defined_channels(active_gates):
-    defined_channels = []
-    gate_numbers = set(active_gates)
-    
-    for channel_key, channel_data in CHANNELS.items():
-        gate1, gate2 = channel_data['gates']
-        if gate1 in gate_numbers and gate2 in gate_numbers:
-            defined_channels.append(channel_key)
-    
-    return defined_channels
+    return channels_from_mask(channel_mask(gate_mask(set(active_gates))))
 
 def get_defined_centers(defined_channels):
     defined_centers = set()
@@ -124,40 +312,17 @@ def get_defined_centers(defined_channels):
                 defined_centers.add(center)
     return defined_centers
 
+def _masks(defined_centers, defined_channels):
+    channels = 0
+    for channel_key in defined_channels:
+        channels |= 1 << CHANNEL_KEYS.index(channel_key)
+    centers = 0
+    for center in defined_centers:
+        centers |= CENTER_BITS[center]
+    return centers, center_components(edge_mask(channels))
+
 def calculate_type(defined_centers, defined_channels):
-    has_sacral = 'Sacral' in defined_centers
-    has_throat = 'Throat' in defined_centers
-    
-    motor_centers = {'Sacral', 'Heart', 'Solar Plexus', 'Root'}
-    has_motor = bool(defined_centers & motor_centers)
-    
-    throat_connected_to_motor = False
-    if has_throat:
-        for channel_key in defined_channels:
-            channel = CHANNELS[channel_key]
-            if 'Throat' in channel['centers']:
-                other_center = [c for c in channel['centers'] if c != 'Throat'][0]
-                if other_center in motor_centers:
-                    throat_connected_to_motor = True
-                    break
-                for sub_channel_key in defined_channels:
-                    sub_channel = CHANNELS[sub_channel_key]
-                    if other_center in sub_channel['centers']:
-                        sub_other = [c for c in sub_channel['centers'] if c != other_center][0]
-                        if sub_other in motor_centers:
-                            throat_connected_to_motor = True
-                            break
-    
-    if has_sacral:
-        if throat_connected_to_motor:
-            return "Manifesting Generator"
-        return "Generator"
-    elif throat_connected_to_motor:
-        return "Manifestor"
-    elif len(defined_centers) > 0:
-        return "Projector"
-    else:
-        return "Reflector"
+    return _type_from_masks(*_masks(defined_centers, defined_channels))
 
 def calculate_authority(hd_type, defined_centers):
     if hd_type == "Reflector":
@@ -179,42 +344,7 @@ def calculate_authority(hd_type, defined_centers):
     return "None (Outer Authority)"
 
 def calculate_definition(defined_centers, defined_channels):
-    if len(defined_centers) == 0:
-        return "No Definition"
-    
-    if len(defined_centers) == 1:
-        return "Single Definition"
-    
-    groups = []
-    remaining_centers = set(defined_centers)
-    
-    while remaining_centers:
-        current_center = remaining_centers.pop()
-        current_group = {current_center}
-        
-        changed = True
-        while changed:
-            changed = False
-            for channel_key in defined_channels:
-                channel = CHANNELS[channel_key]
-                centers_in_channel = set(channel['centers'])
-                if centers_in_channel & current_group:
-                    new_centers = centers_in_channel - current_group
-                    if new_centers & remaining_centers:
-                        current_group.update(new_centers)
-                        remaining_centers -= new_centers
-                        changed = True
-        
-        groups.append(current_group)
-    
-    if len(groups) == 1:
-        return "Single Definition"
-    elif len(groups) == 2:
-        return "Split Definition"
-    elif len(groups) == 3:
-        return "Triple Split"
-    else:
-        return "Quadruple Split"
+    return _definition_from_masks(*_masks(defined_centers, defined_channels))
 
 def calculate_incarnation_cross(personality_gates, design_gates):
     p_sun = personality_gates.get('Sun', {}).get('gate', 0)
@@ -240,12 +370,10 @@ def analyze_chart(natal_chart):
     for planet_data in design_gates.values():
         all_gates.add(planet_data['gate'])
     
-    defined_channels = get_defined_channels(all_gates)
-    defined_centers = get_defined_centers(defined_channels)
-    
-    hd_type = calculate_type(defined_centers, defined_channels)
-    authority = calculate_authority(hd_type, defined_centers)
-    definition = calculate_definition(defined_centers, defined_channels)
+    channels = channel_mask(gate_mask(all_gates))
+    centers, hd_type, authority, definition = analyze_channel_mask(channels)
+    defined_channels = channels_from_mask(channels)
+    defined_centers = centers_from_mask(centers)
     
     p_sun_line = personality_gates.get('Sun', {}).get('line', 1)
     d_sun_line = design_gates.get('Sun', {}).get('line', 1)
@@ -260,12 +388,109 @@ def analyze_chart(natal_chart):
         'profile': profile,
         'incarnation_cross': cross,
         'defined_channels': defined_channels,
-        'defined_centers': list(defined_centers),
+        'defined_centers': defined_centers,
         'all_gates': list(all_gates),
         'personality_gates': personality_gates,
         'design_gates': design_gates
     }
 
+# ============ BATCH ANALYSIS ============
+
+TYPE_NAMES = np.array(["Reflector", "Projector", "Manifestor", "Generator", "Manifesting Generator"], dtype=object)
+AUTHORITY_NAMES = np.array([
+    "Lunar", "Emotional", "Sacral", "Splenic", "Ego", "Self-Projected",
+    "Mental (Outer Authority)", "None (Outer Authority)"
+], dtype=object)
+DEFINITION_LEVELS = np.array([
+    "No Definition", "Single Definition", "Split Definition", "Triple Split", "Quadruple Split"
+], dtype=object)
+
+# PROFILE_NAMES[personality_line, design_line] -> 'p/d'
+PROFILE_NAMES = np.array([[f"{p}/{d}" for d in range(7)] for p in range(7)], dtype=object)
+
+_CHANNEL_GATES = np.array([CHANNELS[key]['gates'] for key in CHANNEL_KEYS]) - 1
+_CHANNEL_CENTER_TABLES = np.array(_CHANNEL_CENTERS, dtype=np.int64)
+_CHANNEL_EDGE_TABLES = np.array(_CHANNEL_EDGES, dtype=np.int64)
+_CENTER_INDEX = {name: i for i, name in enumerate(CENTER_NAMES)}
+
+def _lookup_array(tables, masks):
+    result = np.zeros(len(masks), dtype=np.int64)
+    for k, table in enumerate(tables):
+        result |= table[(masks >> (8 * k)) & 0xFF]
+    return result
+
+def _unpack(masks, n_bits):
+    return ((masks[:, None] >> np.arange(n_bits, dtype=np.int64)) & 1).astype(bool)
+
+def _connectivity_columns(edge_masks):
+    # Throat-motor connection and group count per row, one union-find per distinct edge mask
+    unique, inverse = np.unique(edge_masks, return_inverse=True)
+    connected = np.empty(len(unique), dtype=bool)
+    groups = np.empty(len(unique), dtype=np.int8)
+    throat = CENTER_BITS['Throat']
+    for i, edges in enumerate(unique.tolist()):
+        components = center_components(edges)
+        connected[i] = any(group & throat and group & MOTOR_MASK for group in components)
+        groups[i] = len(components)
+    return connected[inverse.ravel()], groups[inverse.ravel()]
+
+def analyze_charts_batch(gate_matrix, line_matrix=None):
+    """
+    analyze_chart for every row of an (N, 26) gate matrix at once.
+    
+    Rows hold the personality activations followed by the design ones,
+    each in hd_calculations.BODY_NAMES order (Sun first), as produced by
+    calculate_natal_charts_batch. line_matrix, with the same layout, adds
+    the profile. Returns columnar arrays ready for pandas: one-dimensional
+    'type', 'authority', 'definition', 'profile', 'gate_mask',
+    'channel_mask', 'center_mask' and 'defined_center_count' columns, plus
+    (N, 36) 'defined_channels' and (N, 9) 'defined_centers' boolean
+    matrices in CHANNEL_KEYS and CENTER_NAMES column order.
+    """
+    gate_matrix = np.asarray(gate_matrix)
+    n_rows, n_cols = gate_matrix.shape
+    active = np.zeros((n_rows, 64), dtype=bool)
+    active[np.arange(n_rows)[:, None], gate_matrix.astype(np.intp) - 1] = True
+    
+    channels = active[:, _CHANNEL_GATES[:, 0]] & active[:, _CHANNEL_GATES[:, 1]]
+    channel_masks = np.packbits(channels, axis=1, bitorder='little').astype(np.int64)
+    channel_masks = (channel_masks << (8 * np.arange(channel_masks.shape[1], dtype=np.int64))).sum(axis=1)
+    center_masks = _lookup_array(_CHANNEL_CENTER_TABLES, channel_masks)
+    edge_masks = _lookup_array(_CHANNEL_EDGE_TABLES, channel_masks)
+    centers = _unpack(center_masks, len(CENTER_NAMES))
+    throat_connected_to_motor, groups = _connectivity_columns(edge_masks)
+    
+    sacral = centers[:, _CENTER_INDEX['Sacral']]
+    any_center = centers.any(axis=1)
+    type_codes = np.select(
+        [sacral & throat_connected_to_motor, sacral, throat_connected_to_motor, any_center],
+        [4, 3, 2, 1],
+        default=0
+    )
+    
+    authority_conditions = [type_codes == 0]
+    for center, _ in AUTHORITY_ORDER:
+        authority_conditions.append(centers[:, _CENTER_INDEX[center]])
+    authority_conditions.append(centers[:, _CENTER_INDEX['Ajna']] | centers[:, _CENTER_INDEX['Head']])
+    authority_codes = np.select(authority_conditions, np.arange(len(authority_conditions)), default=7)
+    
+    result = {
+        'type': TYPE_NAMES[type_codes],
+        'authority': AUTHORITY_NAMES[authority_codes],
+        'definition': DEFINITION_LEVELS[np.minimum(groups, 4)],
+        'gate_mask': np.packbits(active, axis=1, bitorder='little').view('<u8').ravel(),
+        'channel_mask': channel_masks,
+        'center_mask': center_masks,
+        'defined_center_count': centers.sum(axis=1),
+        'defined_channels': channels,
+        'defined_centers': centers
+    }
+    if line_matrix is not None:
+        line_matrix = np.asarray(line_matrix)
+        half = n_cols // 2
+        result['profile'] = PROFILE_NAMES[line_matrix[:, 0], line_matrix[:, half]]
+    return result
+
 STRATEGY = {
     "Generator": "Wait to Respond",
     "Manifesting Generator": "Wait to Respond, then Inform",
@@ -1,8 +1,14 @@
+import os
+import threading
 import swisseph as swe
 from datetime import datetime, timedelta
+import numpy as np
 import pytz
-from geopy.geocoders import Nominatim
-from timezonefinder import TimezoneFinder
+
+from hd_ephemeris import get_backend
+from hd_gazetteer import lookup_location, suggest_locations as gazetteer_suggestions
+from hd_geocoding import get_geocoder
+from hd_gates import lookup_gate
 
 swe.set_ephe_path(None)
 
@@ -20,6 +26,9 @@ PLANETS = {
     'Pluto': swe.PLUTO
 }
 
+# Column order of the (N, 13) arrays returned by the batch functions
+BODY_NAMES = list(PLANETS) + ['Earth', 'South Node']
+
 GATE_BOUNDARIES = [
     (0.0, 3.875, 25),
     (3.875, 9.5, 17),
@@ -89,19 +98,8 @@ GATE_BOUNDARIES = [
 ]
 
 def get_gate_from_longitude(longitude):
-    longitude = longitude % 360
-    for start, end, gate in GATE_BOUNDARIES:
-        if start <= longitude < end:
-            gate_size = end - start
-            position_in_gate = longitude - start
-            line = int((position_in_gate / gate_size) * 6) + 1
-            return gate, min(line, 6)
-    if longitude >= 358.25:
-        position_in_gate = longitude - 358.25
-        gate_size = 360.0 - 358.25 + 3.875
-        line = int((position_in_gate / gate_size) * 6) + 1
-        return 25, min(line, 6)
-    return 25, 1
+    gate, line, _, _, _ = lookup_gate(longitude)
+    return gate, line
 
 def datetime_to_julian(dt, timezone_str='UTC'):
     if dt.tzinfo is None:
@@ -112,6 +110,135 @@ def datetime_to_julian(dt, timezone_str='UTC'):
     jd = swe.julday(utc_dt.year, utc_dt.month, utc_dt.day, hour_decimal)
     return jd
 
+def julian_to_datetime(jd):
+    year, month, day, hour = swe.revjul(jd)
+    return datetime(year, month, day, tzinfo=pytz.UTC) + timedelta(hours=hour)
+
+# Julian day of the Unix epoch, 1970-01-01 00:00 UTC
+UNIX_EPOCH_JD = 2440587.5
+
+_TRANSITION_TABLES = {}
+
+def timezone_transitions(timezone_str):
+    """
+    UTC-offset intervals of a pytz zone as arrays (local_starts, local_ends,
+    offsets, dst), built once per zone from pytz's transition list.
+    
+    Interval i covers wall-clock seconds since the epoch in
+    [local_starts[i], local_ends[i]) at offsets[i] seconds east of UTC;
+    dst[i] marks daylight-saving intervals. Wall-clock times in no interval
+    fall in a DST gap, times in two fall in a fold.
+    """
+    table = _TRANSITION_TABLES.get(timezone_str)
+    if table is None:
+        tz = pytz.timezone(timezone_str)
+        transitions = getattr(tz, '_utc_transition_times', None)
+        if transitions:
+            utc_starts = np.array(transitions, dtype='datetime64[s]').astype(np.int64)
+            offsets = np.array([int(info[0].total_seconds()) for info in tz._transition_info], dtype=np.int64)
+            dst = np.array([bool(info[1]) for info in tz._transition_info])
+        else:
+            utc_starts = np.array([np.iinfo(np.int64).min // 2], dtype=np.int64)
+            offsets = np.array([int(tz.utcoffset(datetime(2000, 1, 1)).total_seconds())], dtype=np.int64)
+            dst = np.zeros(1, dtype=bool)
+        utc_ends = np.append(utc_starts[1:], np.iinfo(np.int64).max // 2)
+        table = (utc_starts + offsets, utc_ends + offsets, offsets, dst)
+        _TRANSITION_TABLES[timezone_str] = table
+    return table
+
+def _localize_seconds(local_seconds, timezone_str, ambiguous, nonexistent):
+    """UTC seconds for wall-clock seconds in one zone; NaN where unresolved."""
+    local_starts, local_ends, offsets, dst = timezone_transitions(timezone_str)
+    # Last interval starting at or before each time, and the one before it
+    after = np.maximum(np.searchsorted(local_starts, local_seconds, side='right') - 1, 0)
+    before = np.maximum(after - 1, 0)
+    in_after = local_seconds < local_ends[after]
+    in_before = (after > 0) & (local_seconds < local_ends[before])
+    
+    utc = (local_seconds - offsets[after]).astype(float)
+    
+    gap = ~in_after
+    if gap.any():
+        # The wall clock jumped over these: `after` is the interval before the gap
+        if nonexistent is None:
+            bad = local_seconds[gap][0]
+            raise pytz.NonExistentTimeError(f"{np.datetime64(int(bad), 's')} in {timezone_str}")
+        if nonexistent == 'nan':
+            utc[gap] = np.nan
+        else:
+            side = np.minimum(after[gap] + 1, len(offsets) - 1) if nonexistent else after[gap]
+            utc[gap] = local_seconds[gap] - offsets[side]
+    
+    fold = in_after & in_before
+    if fold.any():
+        # The wall clock ran through these twice, first at offsets[before]
+        if ambiguous is None:
+            bad = local_seconds[fold][0]
+            raise pytz.AmbiguousTimeError(f"{np.datetime64(int(bad), 's')} in {timezone_str}")
+        if ambiguous == 'nan':
+            utc[fold] = np.nan
+        else:
+            # pytz: take the side whose DST flag matches is_dst, else the
+            # earlier instant for is_dst=True and the later one for False
+            earlier, later = before[fold], after[fold]
+            earlier_matches = dst[earlier] == bool(ambiguous)
+            later_matches = dst[later] == bool(ambiguous)
+            use_earlier = np.where(earlier_matches != later_matches, earlier_matches, bool(ambiguous))
+            utc[fold] = local_seconds[fold] - offsets[np.where(use_earlier, earlier, later)]
+    return utc
+
+def localize_batch(local_times, timezones='UTC', ambiguous=False, nonexistent=False):
+    """
+    Convert many wall-clock times to UTC at once; returns float seconds
+    since the Unix epoch.
+    
+    `local_times` is a sequence of naive datetimes (aware ones are taken as
+    they are) or a datetime64 array; `timezones` is one pytz zone name or a
+    sequence aligned with it. Times are grouped by zone and resolved with
+    searchsorted over the zone's transition table.
+    
+    `ambiguous` (times in a DST fold) and `nonexistent` (times in a DST gap)
+    take pytz's is_dst values: False, the default, gives the same result as
+    tz.localize(dt); True picks the DST reading; None raises pytz's
+    AmbiguousTimeError / NonExistentTimeError; 'nan' returns NaN.
+    """
+    if isinstance(local_times, np.ndarray) and np.issubdtype(local_times.dtype, np.datetime64):
+        local_seconds = local_times.astype('datetime64[s]').astype(np.int64)
+        aware = []
+    else:
+        local_times = list(local_times)
+        aware = [i for i, dt in enumerate(local_times) if dt.tzinfo is not None]
+        naive = [dt.astimezone(pytz.UTC).replace(tzinfo=None) if dt.tzinfo is not None else dt
+                 for dt in local_times] if aware else local_times
+        local_seconds = np.array(naive, dtype='datetime64[s]').astype(np.int64)
+    
+    if isinstance(timezones, str):
+        zone_names, zone_index = [timezones], np.zeros(len(local_seconds), dtype=int)
+    else:
+        zone_names, zone_index = np.unique(np.asarray(timezones, dtype=str), return_inverse=True)
+    if aware:
+        # Already converted to UTC above
+        zone_names = list(zone_names) + ['UTC']
+        zone_index = np.array(zone_index)
+        zone_index[aware] = len(zone_names) - 1
+    
+    utc = np.empty(len(local_seconds))
+    order = np.argsort(zone_index, kind='stable')
+    bounds = np.searchsorted(zone_index[order], np.arange(len(zone_names) + 1))
+    for zone, timezone_str in enumerate(zone_names):
+        rows = order[bounds[zone]:bounds[zone + 1]]
+        if len(rows):
+            utc[rows] = _localize_seconds(local_seconds[rows], str(timezone_str), ambiguous, nonexistent)
+    return utc
+
+def datetimes_to_julian(local_times, timezones='UTC', ambiguous=False, nonexistent=False):
+    """
+    Batch datetime_to_julian: Julian days (UT) for many local times in one
+    pass. Arguments are those of localize_batch, which does the conversion.
+    """
+    utc_seconds = localize_batch(local_times, timezones, ambiguous, nonexistent)
+    return UNIX_EPOCH_JD + utc_seconds / 86400.0
+
 def get_planet_position(jd, planet_id):
     result, flag = swe.calc_ut(jd, planet_id)
     return result[0]
@@ -131,61 +258,393 @@ def angle_difference(target, current):
         diff += 360
     return diff
 
-def calculate_design_date(birth_jd):
-    birth_sun_pos = get_planet_position(birth_jd, swe.SUN)
-    target_pos = normalize_angle(birth_sun_pos - 88)
+def get_planet_position_and_speed(jd, planet_id):
+    result, flag = swe.calc_ut(jd, planet_id, swe.FLG_SWIEPH | swe.FLG_SPEED)
+    return result[0], result[3]
+
+def get_sun_positions(jds):
+    return np.array([get_planet_position(jd, swe.SUN) for jd in jds], dtype=float)
+
+def get_sun_positions_and_speeds(jds):
+    pairs = [get_planet_position_and_speed(jd, swe.SUN) for jd in jds]
+    return np.array(pairs, dtype=float).reshape(-1, 2).T
+
+def angle_differences(target, current):
+    return (np.asarray(target) - np.asarray(current) + 180.0) % 360.0 - 180.0
+
+# Scan step in days per body for find_longitude_crossings: short enough that
+# no pair of stations, and never 180 degrees of motion, fits between points.
+# The Sun and Moon are never retrograde, so only the 180 degree limit applies.
+CROSSING_SCAN_STEPS = {
+    'Sun': 30.0,
+    'Moon': 8.0,
+    'North Node': 0.25,
+    'Mercury': 1.0,
+    'Venus': 1.0,
+    'Mars': 2.0,
+    'Jupiter': 4.0,
+    'Saturn': 4.0,
+    'Uranus': 4.0,
+    'Neptune': 4.0,
+    'Pluto': 4.0
+}
+OPPOSITE_BODIES = {'Earth': 'Sun', 'South Node': 'North Node'}
+
+def _find_station(planet_id, jd_low, jd_high, low_speed, tolerance):
+    while jd_high - jd_low > tolerance:
+        jd_mid = (jd_low + jd_high) / 2
+        _, speed = get_planet_position_and_speed(jd_mid, planet_id)
+        if (speed > 0) == (low_speed > 0):
+            jd_low = jd_mid
+        else:
+            jd_high = jd_mid
+    return (jd_low + jd_high) / 2
+
+def _solve_crossing(planet_id, target, jd_low, jd_high, direct, tolerance):
+    # Newton steps with the body's own speed, bisection whenever a step leaves the bracket
+    jd = (jd_low + jd_high) / 2
+    for _ in range(100):
+        longitude, speed = get_planet_position_and_speed(jd, planet_id)
+        diff = angle_difference(longitude, target)
+        if (diff < 0) == direct:
+            jd_low = jd
+        else:
+            jd_high = jd
+        next_jd = jd - diff / speed if speed else None
+        if next_jd is None or not jd_low <= next_jd <= jd_high:
+            next_jd = (jd_low + jd_high) / 2
+        if abs(next_jd - jd) < tolerance or jd_high - jd_low < tolerance:
+            return next_jd
+        jd = next_jd
+    return jd
+
+def _monotonic_crossings(planet_id, targets, jd_low, jd_high, low_lon, high_lon, direct, tolerance):
+    # Targets passed in (low_lon, high_lon] when moving direct, [high_lon, low_lon) retrograde
+    travel = abs(angle_difference(high_lon, low_lon))
+    if direct:
+        distances = (targets - low_lon) % 360.0
+    else:
+        distances = (low_lon - targets) % 360.0
+    crossed = np.flatnonzero((distances > 0) & (distances <= travel))
+    for i in crossed[np.argsort(distances[crossed])]:
+        jd = _solve_crossing(planet_id, targets[i], jd_low, jd_high, direct, tolerance)
+        yield jd, i, 1 if direct else -1
+
+def find_longitude_crossings(body, targets, start_jd, end_jd, tolerance=1e-7):
+    """
+    Every instant in (start_jd, end_jd] at which `body` crosses one of `targets`.
+    
+    body is a PLANETS name, 'Earth' or 'South Node'; targets is one longitude
+    or a sequence of them. The body is scanned with CROSSING_SCAN_STEPS,
+    intervals are split at stations so retrograde loops yield every root,
+    and each root is refined with Newton steps on the body's speed (falling
+    back to bisection) to `tolerance` days. Returns (jd, target, direction)
+    tuples sorted by time, direction 1 for direct and -1 for retrograde.
+    
+    Design dates, gate/line ingresses (hd_ingress) and returns are all
+    instances of this search.
+    """
+    target_list = [float(target) for target in np.atleast_1d(targets)]
+    source = OPPOSITE_BODIES.get(body, body)
+    planet_id = PLANETS[source]
+    shifted = np.asarray(target_list, dtype=float) % 360.0
+    if source != body:
+        shifted = (shifted + 180.0) % 360.0
+    
+    step = CROSSING_SCAN_STEPS[source]
+    count = max(1, int(np.ceil((end_jd - start_jd) / step)))
+    grid = (start_jd + (end_jd - start_jd) * np.arange(count + 1) / count).tolist()
+    samples = [get_planet_position_and_speed(jd, planet_id) for jd in grid]
+    
+    crossings = []
+    for i in range(count):
+        jd0, jd1 = grid[i], grid[i + 1]
+        (lon0, speed0), (lon1, speed1) = samples[i], samples[i + 1]
+        if (speed0 > 0) == (speed1 > 0):
+            pieces = [(jd0, jd1, lon0, lon1, speed0 > 0)]
+        else:
+            station = _find_station(planet_id, jd0, jd1, speed0, tolerance)
+            station_lon, _ = get_planet_position_and_speed(station, planet_id)
+            pieces = [
+                (jd0, station, lon0, station_lon, speed0 > 0),
+                (station, jd1, station_lon, lon1, speed1 > 0)
+            ]
+        for piece in pieces:
+            for jd, index, direction in _monotonic_crossings(planet_id, shifted, *piece, tolerance):
+                crossings.append((float(jd), target_list[index], direction))
+    
+    crossings.sort(key=lambda crossing: crossing[0])
+    return crossings
+
+# Mean solar motion in degrees/day, used for the initial design-date guess
+MEAN_SUN_SPEED = 0.9856474
+
+DESIGN_OFFSET_TABLE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'data', 'design_offsets.npz'
+)
+
+def load_design_offset_table(path=DESIGN_OFFSET_TABLE_PATH):
+    """Load the birth->design offset table written by generate_design_offsets.py."""
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        return {
+            'start_jd': float(data['start_jd']),
+            'step': float(data['step']),
+            'offsets': float(data['base']) + data['offsets'].astype(np.float64)
+        }
+
+DESIGN_OFFSET_TABLE = load_design_offset_table()
+
+def design_dates_from_table(birth_jds, refine=False):
+    """
+    Look up design Julian days in DESIGN_OFFSET_TABLE (1800-2200).
+    
+    Cubic interpolation of the tabulated offsets is accurate to well under a
+    second and needs no ephemeris calls. refine=True adds one Newton step on
+    the Sun (two evaluations per birth) for full solver precision. Births
+    outside the table, or all births if the table is missing, come back as NaN.
+    """
+    scalar = np.ndim(birth_jds) == 0
+    birth_jds = np.atleast_1d(np.asarray(birth_jds, dtype=float))
+    design_jds = np.full(birth_jds.shape, np.nan)
+    
+    table = DESIGN_OFFSET_TABLE
+    if table is not None:
+        offsets = table['offsets']
+        x = (birth_jds - table['start_jd']) / table['step']
+        inside = (x >= 1) & (x < len(offsets) - 2)
+        i = np.floor(x[inside]).astype(int)
+        t = x[inside] - i
+        p0, p1, p2, p3 = offsets[i - 1], offsets[i], offsets[i + 1], offsets[i + 2]
+        offset = (
+            -t * (t - 1) * (t - 2) / 6 * p0
+            + (t + 1) * (t - 1) * (t - 2) / 2 * p1
+            - (t + 1) * t * (t - 2) / 2 * p2
+            + (t + 1) * t * (t - 1) / 6 * p3
+        )
+        design_jds[inside] = birth_jds[inside] - offset
+        
+        if refine and inside.any():
+            target_pos = (get_sun_positions(birth_jds[inside]) - 88.0) % 360.0
+            sun_pos, sun_speed = get_sun_positions_and_speeds(design_jds[inside])
+            design_jds[inside] += angle_differences(target_pos, sun_pos) / sun_speed
     
+    return float(design_jds[0]) if scalar else design_jds
+
+def birth_dates_from_table(design_jds):
+    """
+    Inverse of design_dates_from_table: the birth Julian days whose design
+    date is design_jds. The offset changes by under a minute per day, so a
+    few fixed-point steps converge; births outside the table come back as NaN.
+    """
+    scalar = np.ndim(design_jds) == 0
+    design_jds = np.atleast_1d(np.asarray(design_jds, dtype=float))
+    birth_jds = design_jds + 88 / MEAN_SUN_SPEED
+    for _ in range(6):
+        birth_jds = birth_jds + (design_jds - design_dates_from_table(birth_jds))
+    return float(birth_jds[0]) if scalar else birth_jds
+
+def _bisect_design_date(birth_jd, target_pos):
     jd_low = birth_jd - 100
     jd_high = birth_jd - 70
     
-    low_sun = get_planet_position(jd_low, swe.SUN)
-    high_sun = get_planet_position(jd_high, swe.SUN)
-    
-    low_diff = angle_difference(target_pos, low_sun)
-    high_diff = angle_difference(target_pos, high_sun)
+    low_diff = angle_difference(target_pos, get_planet_position(jd_low, swe.SUN))
+    high_diff = angle_difference(target_pos, get_planet_position(jd_high, swe.SUN))
+    evaluations = 2
     
     if low_diff * high_diff > 0:
         jd_low = birth_jd - 120
         jd_high = birth_jd - 60
+        low_diff = angle_difference(target_pos, get_planet_position(jd_low, swe.SUN))
+        evaluations += 1
     
-    for _ in range(100):
+    for iteration in range(1, 101):
         jd_mid = (jd_low + jd_high) / 2
-        mid_sun = get_planet_position(jd_mid, swe.SUN)
-        mid_diff = angle_difference(target_pos, mid_sun)
+        mid_diff = angle_difference(target_pos, get_planet_position(jd_mid, swe.SUN))
+        evaluations += 1
         
         if abs(mid_diff) < 0.0001:
-            return jd_mid
-        
-        low_diff = angle_difference(target_pos, get_planet_position(jd_low, swe.SUN))
+            break
         
         if low_diff * mid_diff < 0:
             jd_high = jd_mid
         else:
             jd_low = jd_mid
+            low_diff = mid_diff
     
-    return jd_mid
+    return jd_mid, iteration, evaluations
 
-def calculate_planetary_positions(jd):
-    positions = {}
+def calculate_design_date(birth_jd, method='table', tolerance=0.0001, return_info=False):
+    """
+    Find the Julian day when the Sun was 88 degrees behind its birth position.
+    
+    method='newton' steps with the Sun's daily motion from swe.calc_ut and
+    usually converges in 3-5 evaluations; if a step leaves the 60-120 day
+    window or it fails to converge the date is solved with
+    find_longitude_crossings (method 'crossing' in the info). Plain
+    bisection is available directly with method='bisection'. method='table'
+    seeds the Newton iteration from the precomputed offset table, so births
+    in 1800-2200 settle after a single step. With return_info=True returns
+    (design_jd, info) where info reports the method that produced the
+    result, its iterations and the total number of Sun evaluations (None
+    for 'crossing').
+    """
+    if method not in ('table', 'newton', 'bisection'):
+        raise ValueError(f"Unknown design date method: {method}")
+    
+    birth_sun_pos = get_planet_position(birth_jd, swe.SUN)
+    target_pos = normalize_angle(birth_sun_pos - 88)
+    evaluations = 1
+    design_jd = None
+    
+    if method == 'table':
+        jd = design_dates_from_table(birth_jd)
+        if np.isnan(jd):
+            method = 'newton'
+    
+    if method == 'newton':
+        jd = birth_jd - 88 / MEAN_SUN_SPEED
+    
+    if method in ('table', 'newton'):
+        for iteration in range(1, 11):
+            sun_pos, sun_speed = get_planet_position_and_speed(jd, swe.SUN)
+            evaluations += 1
+            diff = angle_difference(target_pos, sun_pos)
+            jd += diff / sun_speed
+            if not birth_jd - 120 <= jd <= birth_jd - 60:
+                break
+            if abs(diff) < tolerance:
+                design_jd = jd
+                break
+    
+    if design_jd is None and method != 'bisection':
+        # The Sun is never retrograde, so the window holds exactly one crossing
+        crossings = find_longitude_crossings(
+            'Sun', target_pos, birth_jd - 120, birth_jd - 60, tolerance / MEAN_SUN_SPEED
+        )
+        if crossings:
+            method = 'crossing'
+            design_jd = crossings[0][0]
+            iteration = evaluations = None
+    
+    if design_jd is None:
+        method = 'bisection'
+        design_jd, iteration, bisect_evaluations = _bisect_design_date(birth_jd, target_pos)
+        evaluations += bisect_evaluations
+    
+    if return_info:
+        return design_jd, {
+            'method': method,
+            'iterations': iteration,
+            'evaluations': evaluations
+        }
+    return design_jd
+
+def _bisect_design_dates(birth_jds, target_pos):
+    jd_low = birth_jds - 100
+    jd_high = birth_jds - 70
     
-    for planet_name, planet_id in PLANETS.items():
-        positions[planet_name] = get_planet_position(jd, planet_id)
+    low_diff = angle_differences(target_pos, get_sun_positions(jd_low))
+    high_diff = angle_differences(target_pos, get_sun_positions(jd_high))
     
-    sun_pos = positions['Sun']
-    positions['Earth'] = normalize_angle(sun_pos + 180)
+    widen = low_diff * high_diff > 0
+    if widen.any():
+        jd_low[widen] = birth_jds[widen] - 120
+        jd_high[widen] = birth_jds[widen] - 60
+        low_diff[widen] = angle_differences(target_pos[widen], get_sun_positions(jd_low[widen]))
     
-    north_node_pos = positions['North Node']
-    positions['South Node'] = normalize_angle(north_node_pos + 180)
+    design_jds = (jd_low + jd_high) / 2
+    active = np.ones(len(birth_jds), dtype=bool)
     
-    return positions
+    for _ in range(100):
+        if not active.any():
+            break
+        idx = np.flatnonzero(active)
+        jd_mid = (jd_low[idx] + jd_high[idx]) / 2
+        mid_diff = angle_differences(target_pos[idx], get_sun_positions(jd_mid))
+        design_jds[idx] = jd_mid
+        
+        converged = np.abs(mid_diff) < 0.0001
+        active[idx[converged]] = False
+        
+        move_high = low_diff[idx] * mid_diff < 0
+        upper = idx[move_high & ~converged]
+        lower = idx[~move_high & ~converged]
+        jd_high[upper] = jd_mid[move_high & ~converged]
+        jd_low[lower] = jd_mid[~move_high & ~converged]
+        low_diff[lower] = mid_diff[~move_high & ~converged]
+    
+    return design_jds
+
+def calculate_design_dates(birth_jds, method='table', tolerance=0.0001):
+    """
+    Solve the design date for an array of birth Julian days at once.
+    Every Newton step advances all unconverged births together; any birth
+    the Newton iteration cannot settle is finished by vectorized bisection.
+    With method='table' births covered by the offset table start from the
+    interpolated design date and converge in one step.
+    """
+    if method not in ('table', 'newton', 'bisection'):
+        raise ValueError(f"Unknown design date method: {method}")
+    
+    birth_jds = np.asarray(birth_jds, dtype=float)
+    target_pos = (get_sun_positions(birth_jds) - 88.0) % 360.0
+    
+    if method == 'bisection':
+        return _bisect_design_dates(birth_jds, target_pos)
+    
+    design_jds = birth_jds - 88 / MEAN_SUN_SPEED
+    if method == 'table':
+        seeded = design_dates_from_table(birth_jds)
+        design_jds = np.where(np.isnan(seeded), design_jds, seeded)
+    active = np.ones(len(birth_jds), dtype=bool)
+    
+    for _ in range(10):
+        if not active.any():
+            break
+        idx = np.flatnonzero(active)
+        sun_pos, sun_speed = get_sun_positions_and_speeds(design_jds[idx])
+        diff = angle_differences(target_pos[idx], sun_pos)
+        design_jds[idx] += diff / sun_speed
+        active[idx[np.abs(diff) < tolerance]] = False
+        
+        offset = birth_jds[idx] - design_jds[idx]
+        escaped = idx[(offset < 60) | (offset > 120)]
+        if len(escaped):
+            design_jds[escaped] = np.nan
+            active[escaped] = False
+    
+    failed = active | np.isnan(design_jds)
+    if failed.any():
+        design_jds[failed] = _bisect_design_dates(birth_jds[failed], target_pos[failed])
+    
+    return design_jds
+
+def calculate_planetary_positions(jd):
+    """Positions of all bodies from the configured ephemeris backend (see hd_ephemeris)."""
+    longitudes = get_backend().positions([jd], BODY_NAMES)[0]
+    return {name: float(longitude) for name, longitude in zip(BODY_NAMES, longitudes)}
+
+def calculate_planetary_positions_batch(jds):
+    """Longitudes for an array of Julian days as an (N, 13) array in BODY_NAMES order."""
+    return get_backend().positions(jds, BODY_NAMES)
+
+def calculate_gates_batch(longitudes):
+    """Gate and line arrays with the same shape as the longitude array."""
+    gates, lines, _, _, _ = lookup_gate(longitudes)
+    return gates, lines
 
 def calculate_gates(positions):
     gates = {}
     for planet, longitude in positions.items():
-        gate, line = get_gate_from_longitude(longitude)
+        gate, line, color, tone, base = lookup_gate(longitude)
         gates[planet] = {
             'gate': gate,
             'line': line,
+            'color': color,
+            'tone': tone,
+            'base': base,
             'longitude': longitude
         }
     return gates
@@ -193,117 +652,31 @@ def calculate_gates(positions):
 def geocode_location(location_str):
     """
     Geocode a location string to get coordinates and timezone.
-    Uses Nominatim with proper headers and retry logic.
+    Cached and rate-limited through hd_geocoding; None when not found.
     """
-    import time
-    
-    try:
-        # Use a more specific user agent to avoid blocks
-        geolocator = Nominatim(
-            user_agent="HumanDesignCalculator/1.0 (Educational Project)",
-            timeout=10
-        )
-        
-        # Add a small delay to respect rate limits
-        time.sleep(1)
-        
-        location = geolocator.geocode(location_str, language='en')
-        
-        if location:
-            tf = TimezoneFinder()
-            timezone_str = tf.timezone_at(lat=location.latitude, lng=location.longitude)
-            return {
-                'latitude': location.latitude,
-                'longitude': location.longitude,
-                'address': location.address,
-                'timezone': timezone_str or 'UTC'
-            }
-        else:
-            # Try with just the city name if full string fails
-            if ',' in location_str:
-                city = location_str.split(',')[0].strip()
-                time.sleep(1)
-                location = geolocator.geocode(city, language='en')
-                if location:
-                    tf = TimezoneFinder()
-                    timezone_str = tf.timezone_at(lat=location.latitude, lng=location.longitude)
-                    return {
-                        'latitude': location.latitude,
-                        'longitude': location.longitude,
-                        'address': location.address,
-                        'timezone': timezone_str or 'UTC'
-                    }
-    except Exception as e:
-        print(f"Geocoding error: {e}")
-    
-    return None
-
-
-# Common locations lookup table for faster results
-COMMON_LOCATIONS = {
-    "agrinio": {"lat": 38.6216, "lon": 21.4083, "tz": "Europe/Athens", "address": "Agrinio, Greece"},
-    "agrinio, greece": {"lat": 38.6216, "lon": 21.4083, "tz": "Europe/Athens", "address": "Agrinio, Greece"},
-    "athens": {"lat": 37.9838, "lon": 23.7275, "tz": "Europe/Athens", "address": "Athens, Greece"},
-    "athens, greece": {"lat": 37.9838, "lon": 23.7275, "tz": "Europe/Athens", "address": "Athens, Greece"},
-    "new york": {"lat": 40.7128, "lon": -74.0060, "tz": "America/New_York", "address": "New York, USA"},
-    "new york, usa": {"lat": 40.7128, "lon": -74.0060, "tz": "America/New_York", "address": "New York, USA"},
-    "london": {"lat": 51.5074, "lon": -0.1278, "tz": "Europe/London", "address": "London, UK"},
-    "london, uk": {"lat": 51.5074, "lon": -0.1278, "tz": "Europe/London", "address": "London, UK"},
-    "los angeles": {"lat": 34.0522, "lon": -118.2437, "tz": "America/Los_Angeles", "address": "Los Angeles, USA"},
-    "paris": {"lat": 48.8566, "lon": 2.3522, "tz": "Europe/Paris", "address": "Paris, France"},
-    "berlin": {"lat": 52.5200, "lon": 13.4050, "tz": "Europe/Berlin", "address": "Berlin, Germany"},
-    "tokyo": {"lat": 35.6762, "lon": 139.6503, "tz": "Asia/Tokyo", "address": "Tokyo, Japan"},
-    "sydney": {"lat": -33.8688, "lon": 151.2093, "tz": "Australia/Sydney", "address": "Sydney, Australia"},
-    "toronto": {"lat": 43.6532, "lon": -79.3832, "tz": "America/Toronto", "address": "Toronto, Canada"},
-    "chicago": {"lat": 41.8781, "lon": -87.6298, "tz": "America/Chicago", "address": "Chicago, USA"},
-    "miami": {"lat": 25.7617, "lon": -80.1918, "tz": "America/New_York", "address": "Miami, USA"},
-    "san francisco": {"lat": 37.7749, "lon": -122.4194, "tz": "America/Los_Angeles", "address": "San Francisco, USA"},
-    "seattle": {"lat": 47.6062, "lon": -122.3321, "tz": "America/Los_Angeles", "address": "Seattle, USA"},
-    "boston": {"lat": 42.3601, "lon": -71.0589, "tz": "America/New_York", "address": "Boston, USA"},
-    "denver": {"lat": 39.7392, "lon": -104.9903, "tz": "America/Denver", "address": "Denver, USA"},
-    "phoenix": {"lat": 33.4484, "lon": -112.0740, "tz": "America/Phoenix", "address": "Phoenix, USA"},
-    "amsterdam": {"lat": 52.3676, "lon": 4.9041, "tz": "Europe/Amsterdam", "address": "Amsterdam, Netherlands"},
-    "rome": {"lat": 41.9028, "lon": 12.4964, "tz": "Europe/Rome", "address": "Rome, Italy"},
-    "madrid": {"lat": 40.4168, "lon": -3.7038, "tz": "Europe/Madrid", "address": "Madrid, Spain"},
-    "barcelona": {"lat": 41.3851, "lon": 2.1734, "tz": "Europe/Madrid", "address": "Barcelona, Spain"},
-    "munich": {"lat": 48.1351, "lon": 11.5820, "tz": "Europe/Berlin", "address": "Munich, Germany"},
-    "vienna": {"lat": 48.2082, "lon": 16.3738, "tz": "Europe/Vienna", "address": "Vienna, Austria"},
-    "zurich": {"lat": 47.3769, "lon": 8.5417, "tz": "Europe/Zurich", "address": "Zurich, Switzerland"},
-    "moscow": {"lat": 55.7558, "lon": 37.6173, "tz": "Europe/Moscow", "address": "Moscow, Russia"},
-    "dubai": {"lat": 25.2048, "lon": 55.2708, "tz": "Asia/Dubai", "address": "Dubai, UAE"},
-    "singapore": {"lat": 1.3521, "lon": 103.8198, "tz": "Asia/Singapore", "address": "Singapore"},
-    "hong kong": {"lat": 22.3193, "lon": 114.1694, "tz": "Asia/Hong_Kong", "address": "Hong Kong"},
-    "seoul": {"lat": 37.5665, "lon": 126.9780, "tz": "Asia/Seoul", "address": "Seoul, South Korea"},
-    "mumbai": {"lat": 19.0760, "lon": 72.8777, "tz": "Asia/Kolkata", "address": "Mumbai, India"},
-    "delhi": {"lat": 28.7041, "lon": 77.1025, "tz": "Asia/Kolkata", "address": "Delhi, India"},
-    "melbourne": {"lat": -37.8136, "lon": 144.9631, "tz": "Australia/Melbourne", "address": "Melbourne, Australia"},
-    "auckland": {"lat": -36.8509, "lon": 174.7645, "tz": "Pacific/Auckland", "address": "Auckland, New Zealand"},
-    "cape town": {"lat": -33.9249, "lon": 18.4241, "tz": "Africa/Johannesburg", "address": "Cape Town, South Africa"},
-    "cairo": {"lat": 30.0444, "lon": 31.2357, "tz": "Africa/Cairo", "address": "Cairo, Egypt"},
-    "mexico city": {"lat": 19.4326, "lon": -99.1332, "tz": "America/Mexico_City", "address": "Mexico City, Mexico"},
-    "sao paulo": {"lat": -23.5505, "lon": -46.6333, "tz": "America/Sao_Paulo", "address": "São Paulo, Brazil"},
-    "buenos aires": {"lat": -34.6037, "lon": -58.3816, "tz": "America/Argentina/Buenos_Aires", "address": "Buenos Aires, Argentina"},
-}
+    return get_geocoder().geocode(location_str)
 
 
 def geocode_location_with_fallback(location_str):
     """
-    Try common locations first, then fall back to geocoding API.
+    Try the offline gazetteer first, then fall back to geocoding API.
     """
-    # Check common locations first (instant, no API call)
-    location_lower = location_str.lower().strip()
-    if location_lower in COMMON_LOCATIONS:
-        loc = COMMON_LOCATIONS[location_lower]
-        return {
-            'latitude': loc['lat'],
-            'longitude': loc['lon'],
-            'address': loc['address'],
-            'timezone': loc['tz']
-        }
+    # Bundled city index (instant, no API call)
+    location = lookup_location(location_str)
+    if location:
+        return location
     
     # Try geocoding API
     return geocode_location(location_str)
 
+def suggest_locations(partial_location, limit=5):
+    """
+    Typeahead suggestions for a partly typed location from the offline
+    gazetteer, most likely first. Each suggestion's 'address' resolves
+    through geocode_location_with_fallback without a network call.
+    """
+    return gazetteer_suggestions(partial_location, limit)
+
 def calculate_natal_chart(birth_datetime, timezone_str='UTC'):
     jd_birth = datetime_to_julian(birth_datetime, timezone_str)
     jd_design = calculate_design_date(jd_birth)
@@ -327,6 +700,40 @@ def calculate_natal_chart(birth_datetime, timezone_str='UTC'):
         }
     }
 
+def calculate_natal_charts_batch(datetimes, timezones='UTC'):
+    """
+    Calculate many natal charts in one call.
+    
+    `timezones` is either one timezone name for all births or a sequence
+    aligned with `datetimes`. Returns NumPy arrays instead of nested dicts:
+    longitudes, gates and lines are (N, 13) arrays whose columns follow
+    BODY_NAMES.
+    """
+    birth_jds = datetimes_to_julian(datetimes, timezones)
+    design_jds = calculate_design_dates(birth_jds)
+    
+    personality_positions = calculate_planetary_positions_batch(birth_jds)
+    design_positions = calculate_planetary_positions_batch(design_jds)
+    
+    personality_gates, personality_lines = calculate_gates_batch(personality_positions)
+    design_gates, design_lines = calculate_gates_batch(design_positions)
+    
+    return {
+        'bodies': BODY_NAMES,
+        'birth_jd': birth_jds,
+        'design_jd': design_jds,
+        'personality': {
+            'longitudes': personality_positions,
+            'gates': personality_gates,
+            'lines': personality_lines
+        },
+        'design': {
+            'longitudes': design_positions,
+            'gates': design_gates,
+            'lines': design_lines
+        }
+    }
+
 def calculate_transit_chart(transit_datetime=None, timezone_str='UTC'):
     if transit_datetime is None:
         tz = pytz.timezone(timezone_str)
@@ -346,6 +753,58 @@ def calculate_transit_chart(transit_datetime=None, timezone_str='UTC'):
         'gates': transit_gates
     }
 
+def transit_state(gates):
+    return tuple((planet, data['gate'], data['line']) for planet, data in sorted(gates.items()))
+
+# Expire a moment after the ingress so the recompute lands past the boundary
+INGRESS_MARGIN = 1e-6
+
+class TransitCache:
+    """
+    The current transit chart, shared by every session in the process.
+    
+    A snapshot stays valid until the next gate/line ingress of any body
+    (from hd_ingress), so reruns in between cost nothing. On expiry the
+    positions are recomputed; if no gate or line changed, the old
+    snapshot is kept.
+    """
+    
+    def __init__(self, max_age=1.0):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._chart = None
+        self._state = None
+        self._valid_from = None
+        self._expires = None
+    
+    def get(self, now=None):
+        if now is None:
+            now = datetime.now(pytz.UTC)
+        jd = datetime_to_julian(now, 'UTC')
+        with self._lock:
+            if self._chart is not None and self._valid_from <= jd < self._expires:
+                return self._chart
+            
+            chart = calculate_transit_chart(now, 'UTC')
+            state = transit_state(chart['gates'])
+            if state != self._state or not self._valid_from <= jd:
+                self._chart = chart
+                self._state = state
+                self._valid_from = jd
+            from hd_ingress import next_ingress
+            event = next_ingress(jd, level='line', horizon=self.max_age)
+            self._expires = event['jd'] + INGRESS_MARGIN if event else jd + self.max_age
+            return self._chart
+    
+    def clear(self):
+        with self._lock:
+            self._chart = self._state = self._valid_from = self._expires = None
+
+TRANSIT_CACHE = TransitCache()
+
+def get_current_transit_chart():
+    return TRANSIT_CACHE.get()
+
 def get_profile(personality_sun_line, design_sun_line):
     return f"{personality_sun_line}/{design_sun_line}"
 
@@ -5,17 +5,21 @@ Use this if pyswisseph won't compile on your system.
 To use: rename this file to hd_calculations.py
 """
 
+import math
+import threading
 from datetime import datetime, timedelta
+import numpy as np
 import pytz
-from geopy.geocoders import Nominatim
-from timezonefinder import TimezoneFinder
+
+from hd_ephemeris import BODIES
+from hd_gazetteer import lookup_location, suggest_locations as gazetteer_suggestions
+from hd_geocoding import get_geocoder
+from hd_gates import lookup_gate
 
 # Try to import flatlib, fall back to basic calculations if not available
 try:
-    from flatlib.datetime import Datetime
-    from flatlib.geopos import GeoPos
-    from flatlib.chart import Chart
     from flatlib import const
+    from flatlib.ephem import swe as flatlib_swe
     FLATLIB_AVAILABLE = True
 except ImportError:
     FLATLIB_AVAILABLE = False
@@ -44,19 +48,8 @@ GATE_BOUNDARIES = [
 
 def get_gate_from_longitude(longitude):
     """Convert longitude to gate and line."""
-    longitude = longitude % 360
-    for start, end, gate in GATE_BOUNDARIES:
-        if start <= longitude < end:
-            gate_size = end - start
-            position_in_gate = longitude - start
-            line = int((position_in_gate / gate_size) * 6) + 1
-            return gate, min(line, 6)
-    if longitude >= 358.25:
-        position_in_gate = longitude - 358.25
-        gate_size = 360.0 - 358.25 + 3.875
-        line = int((position_in_gate / gate_size) * 6) + 1
-        return 25, min(line, 6)
-    return 25, 1
+    gate, line, _, _, _ = lookup_gate(longitude)
+    return gate, line
 
 def normalize_angle(angle):
     """Normalize angle to 0-360 range."""
@@ -69,31 +62,22 @@ def normalize_angle(angle):
 
 # ============ FLATLIB IMPLEMENTATION ============
 
-def get_planetary_positions_flatlib(dt, timezone_str='UTC'):
-    """Get planetary positions using flatlib."""
-    if not FLATLIB_AVAILABLE:
-        return get_planetary_positions_basic(dt, timezone_str)
-    
-    # Convert to UTC
+def to_utc(dt, timezone_str='UTC'):
+    """Localize a naive datetime in timezone_str and convert it to UTC."""
     if dt.tzinfo is None:
         tz = pytz.timezone(timezone_str)
         dt = tz.localize(dt)
-    utc_dt = dt.astimezone(pytz.UTC)
-    
-    # Create flatlib datetime
-    date_str = utc_dt.strftime('%Y/%m/%d')
-    time_str = utc_dt.strftime('%H:%M:%S')
-    
-    # Create chart (using generic location - longitude doesn't affect planetary positions much)
-    fl_date = Datetime(date_str, time_str, '+00:00')
-    pos = GeoPos('0n00', '0e00')  # Equator, prime meridian
-    
-    chart = Chart(fl_date, pos)
-    
-    positions = {}
-    
-    # Get positions for each planet
-    planet_map = {
+    return dt.astimezone(pytz.UTC)
+
+def utc_to_julian_day(utc_dt):
+    """Julian Day for an aware UTC datetime."""
+    return julian_day(
+        utc_dt.year, utc_dt.month, utc_dt.day,
+        utc_dt.hour + utc_dt.minute/60 + utc_dt.second/3600
+    )
+
+if FLATLIB_AVAILABLE:
+    FLATLIB_OBJECTS = {
         'Sun': const.SUN,
         'Moon': const.MOON,
         'Mercury': const.MERCURY,
@@ -106,10 +90,24 @@ def get_planetary_positions_flatlib(dt, timezone_str='UTC'):
         'Pluto': const.PLUTO,
         'North Node': const.NORTH_NODE,
     }
+
+def get_planetary_positions_flatlib(dt, timezone_str='UTC'):
+    """Get planetary positions using flatlib."""
+    if not FLATLIB_AVAILABLE:
+        return get_planetary_positions_basic(dt, timezone_str)
+    return get_planetary_positions_flatlib_jd(utc_to_julian_day(to_utc(dt, timezone_str)))
+
+def get_planetary_positions_flatlib_jd(jd):
+    """
+    Planetary positions for a Julian Day from flatlib's ephemeris.
     
-    for name, planet_const in planet_map.items():
-        obj = chart.get(planet_const)
-        positions[name] = obj.lon
+    Reads each object straight from flatlib.ephem instead of building a
+    Chart, which would also compute houses, angles and Arabic parts (and
+    by default only includes the traditional planets).
+    """
+    positions = {}
+    for name, planet_const in FLATLIB_OBJECTS.items():
+        positions[name] = flatlib_swe.sweObjectLon(planet_const, jd)
     
     # Calculate Earth (opposite of Sun)
     positions['Earth'] = normalize_angle(positions['Sun'] + 180)
@@ -119,10 +117,20 @@ def get_planetary_positions_flatlib(dt, timezone_str='UTC'):
     
     return positions
 
+def get_sun_longitude(jd):
+    """Sun-only fast path used by the design-date search."""
+    if FLATLIB_AVAILABLE:
+        return flatlib_swe.sweObjectLon(const.SUN, jd)
+    return sun_longitude_basic(jd)
 
-# ============ BASIC CALCULATION FALLBACK ============
+def get_positions_jd(jd):
+    """Positions for a Julian Day from flatlib, or the basic formulas without it."""
+    if FLATLIB_AVAILABLE:
+        return get_planetary_positions_flatlib_jd(jd)
+    return get_planetary_positions_basic_jd(jd)
 
-import math
+
+# ============ BASIC CALCULATION FALLBACK ============
 
 def julian_day(year, month, day, hour=0):
     """Calculate Julian Day Number."""
@@ -191,20 +199,24 @@ def moon_longitude_basic(jd):
     
     return normalize_angle(longitude)
 
+# Mean longitude at J2000, degrees per Julian century, equation-of-center amplitude
+SIMPLE_ORBITS = {
+    'Mercury': (252.2509, 149472.6746, 23.4),
+    'Venus': (181.9798, 58517.8157, 0.7758),
+    'Mars': (355.4330, 19140.2993, 10.691),
+    'Jupiter': (34.3515, 3034.9057, 5.555),
+    'Saturn': (50.0774, 1222.1138, 6.39),
+    'Uranus': (314.055, 428.4669, 5.52),
+    'Neptune': (304.349, 218.4862, 0.8883),
+    'Pluto': (238.929, 145.1781, 14.882),
+}
+
 def get_planetary_positions_basic(dt, timezone_str='UTC'):
     """Basic planetary position calculations (less accurate but no dependencies)."""
-    # Convert to UTC
-    if dt.tzinfo is None:
-        tz = pytz.timezone(timezone_str)
-        dt = tz.localize(dt)
-    utc_dt = dt.astimezone(pytz.UTC)
-    
-    # Calculate Julian Day
-    jd = julian_day(
-        utc_dt.year, utc_dt.month, utc_dt.day,
-        utc_dt.hour + utc_dt.minute/60 + utc_dt.second/3600
-    )
-    
+    return get_planetary_positions_basic_jd(utc_to_julian_day(to_utc(dt, timezone_str)))
+
+def get_planetary_positions_basic_jd(jd):
+    """Basic planetary positions for a Julian Day."""
     T = (jd - 2451545.0) / 36525.0
     
     positions = {}
@@ -216,37 +228,10 @@ def get_planetary_positions_basic(dt, timezone_str='UTC'):
     # Moon
     positions['Moon'] = moon_longitude_basic(jd)
     
-    # Mercury (simplified)
-    L = 252.2509 + 149472.6746 * T
-    positions['Mercury'] = normalize_angle(L + 23.4 * math.sin(math.radians(L)))
-    
-    # Venus (simplified)
-    L = 181.9798 + 58517.8157 * T
-    positions['Venus'] = normalize_angle(L + 0.7758 * math.sin(math.radians(L)))
-    
-    # Mars (simplified)
-    L = 355.4330 + 19140.2993 * T
-    positions['Mars'] = normalize_angle(L + 10.691 * math.sin(math.radians(L)))
-    
-    # Jupiter (simplified)
-    L = 34.3515 + 3034.9057 * T
-    positions['Jupiter'] = normalize_angle(L + 5.555 * math.sin(math.radians(L)))
-    
-    # Saturn (simplified)
-    L = 50.0774 + 1222.1138 * T
-    positions['Saturn'] = normalize_angle(L + 6.39 * math.sin(math.radians(L)))
-    
-    # Uranus (simplified)
-    L = 314.055 + 428.4669 * T
-    positions['Uranus'] = normalize_angle(L + 5.52 * math.sin(math.radians(L)))
-    
-    # Neptune (simplified)
-    L = 304.349 + 218.4862 * T
-    positions['Neptune'] = normalize_angle(L + 0.8883 * math.sin(math.radians(L)))
-    
-    # Pluto (very simplified)
-    L = 238.929 + 145.1781 * T
-    positions['Pluto'] = normalize_angle(L + 14.882 * math.sin(math.radians(L)))
+    # Other planets (simplified): mean longitude plus one equation-of-center term
+    for planet, (L0, rate, amplitude) in SIMPLE_ORBITS.items():
+        L = L0 + rate * T
+        positions[planet] = normalize_angle(L + amplitude * math.sin(math.radians(L)))
     
     # North Node (mean)
     omega = 125.0445 - 1934.1363 * T
@@ -256,92 +241,147 @@ def get_planetary_positions_basic(dt, timezone_str='UTC'):
     return positions
 
 
-# ============ MAIN FUNCTIONS ============
+# ============ VECTORIZED BASIC CALCULATIONS ============
 
-def calculate_design_date(birth_dt, timezone_str='UTC'):
-    """Calculate the design date (88 solar degrees before birth)."""
-    # Convert to UTC
-    if birth_dt.tzinfo is None:
-        tz = pytz.timezone(timezone_str)
-        birth_dt = tz.localize(birth_dt)
-    utc_birth = birth_dt.astimezone(pytz.UTC)
-    
-    # Get birth sun position
-    if FLATLIB_AVAILABLE:
-        birth_positions = get_planetary_positions_flatlib(utc_birth, 'UTC')
-    else:
-        birth_positions = get_planetary_positions_basic(utc_birth, 'UTC')
-    
-    birth_sun = birth_positions['Sun']
-    target_sun = normalize_angle(birth_sun - 88)
+def sun_longitude_basic_array(jds):
+    """sun_longitude_basic for an array of Julian Days."""
+    T = (np.asarray(jds, dtype=float) - 2451545.0) / 36525.0
+    L0 = 280.46646 + 36000.76983 * T + 0.0003032 * T**2
+    M_rad = np.radians(357.52911 + 35999.05029 * T - 0.0001537 * T**2)
+    C = (1.914602 - 0.004817 * T - 0.000014 * T**2) * np.sin(M_rad)
+    C += (0.019993 - 0.000101 * T) * np.sin(2 * M_rad)
+    C += 0.000289 * np.sin(3 * M_rad)
+    return (L0 + C) % 360
+
+def moon_longitude_basic_array(jds):
+    """moon_longitude_basic for an array of Julian Days."""
+    T = (np.asarray(jds, dtype=float) - 2451545.0) / 36525.0
+    L = 218.3164477 + 481267.88123421 * T
+    M_rad = np.radians(134.9633964 + 477198.8675055 * T)
+    Ms_rad = np.radians(357.5291092 + 35999.0502909 * T)
+    D_rad = np.radians(297.8501921 + 445267.1114034 * T)
+    F_rad = np.radians(93.2720950 + 483202.0175233 * T)
     
-    # Binary search for design date (approximately 88 days before)
-    days_back = 88
-    design_dt = utc_birth - timedelta(days=days_back)
+    longitude = L
+    longitude += 6.288774 * np.sin(M_rad)
+    longitude += 1.274027 * np.sin(2*D_rad - M_rad)
+    longitude += 0.658314 * np.sin(2*D_rad)
+    longitude += 0.213618 * np.sin(2*M_rad)
+    longitude -= 0.185116 * np.sin(Ms_rad)
+    longitude -= 0.114332 * np.sin(2*F_rad)
+    return longitude % 360
+
+def get_planetary_positions_basic_array(jds):
+    """
+    Basic planetary positions for an array of Julian Days.
+    
+    Same formulas as get_planetary_positions_basic, evaluated with NumPy.
+    Returns an (N, 13) longitude matrix with columns in hd_ephemeris.BODIES
+    order, so large sweeps run without swisseph or flatlib.
+    """
+    jds = np.atleast_1d(np.asarray(jds, dtype=float))
+    T = (jds - 2451545.0) / 36525.0
+    result = np.empty((len(jds), len(BODIES)))
+    column = {body: i for i, body in enumerate(BODIES)}
+    
+    result[:, column['Sun']] = sun_longitude_basic_array(jds)
+    result[:, column['Moon']] = moon_longitude_basic_array(jds)
+    for planet, (L0, rate, amplitude) in SIMPLE_ORBITS.items():
+        L = L0 + rate * T
+        result[:, column[planet]] = (L + amplitude * np.sin(np.radians(L))) % 360
+    result[:, column['North Node']] = (125.0445 - 1934.1363 * T) % 360
+    
+    result[:, column['Earth']] = (result[:, column['Sun']] + 180) % 360
+    result[:, column['South Node']] = (result[:, column['North Node']] + 180) % 360
+    return result
+
+
+# ============ MAIN FUNCTIONS ============
+
+# Mean solar motion in degrees/day, seeds the design-date secant iteration
+MEAN_SUN_SPEED = 0.9856474
+
+def sun_offset(birth_jd, target_sun, days_back):
+    """Angular distance from the Sun `days_back` days before birth to target_sun."""
+    diff = target_sun - get_sun_longitude(birth_jd - days_back)
+    if diff > 180:
+        diff -= 360
+    elif diff < -180:
+        diff += 360
+    return diff
+
+def solve_design_days(birth_jd, target_sun, tolerance=0.001):
+    """
+    Days between birth and the design date.
+    
+    Secant iteration on the Sun-only fast path, usually 3-4 evaluations;
+    binary search over 70-100 days is kept as a fallback.
+    """
+    days0 = 88 / MEAN_SUN_SPEED
+    diff0 = sun_offset(birth_jd, target_sun, days0)
+    days1 = days0 - diff0 / MEAN_SUN_SPEED
+    
+    for _ in range(10):
+        diff1 = sun_offset(birth_jd, target_sun, days1)
+        if abs(diff1) < tolerance:
+            return days1
+        if diff1 == diff0:
+            break
+        days0, diff0, days1 = days1, diff1, days1 - diff1 * (days1 - days0) / (diff1 - diff0)
+        if not 70 <= days1 <= 100:
+            break
     
-    # Refine with binary search
     low_days = 70
     high_days = 100
-    
-    for _ in range(50):  # 50 iterations for precision
+    for _ in range(50):
         mid_days = (low_days + high_days) / 2
-        test_dt = utc_birth - timedelta(days=mid_days)
-        
-        if FLATLIB_AVAILABLE:
-            test_positions = get_planetary_positions_flatlib(test_dt, 'UTC')
-        else:
-            test_positions = get_planetary_positions_basic(test_dt, 'UTC')
-        
-        test_sun = test_positions['Sun']
-        
-        # Calculate angular difference
-        diff = target_sun - test_sun
-        if diff > 180:
-            diff -= 360
-        elif diff < -180:
-            diff += 360
-        
-        if abs(diff) < 0.001:  # Close enough
-            design_dt = test_dt
+        diff = sun_offset(birth_jd, target_sun, mid_days)
+        if abs(diff) < tolerance:
             break
-        
         if diff > 0:
             high_days = mid_days
         else:
             low_days = mid_days
-        
-        design_dt = test_dt
-    
-    return design_dt
+    return mid_days
+
+def calculate_design_date(birth_dt, timezone_str='UTC'):
+    """Calculate the design date (88 solar degrees before birth)."""
+    utc_birth = to_utc(birth_dt, timezone_str)
+    birth_jd = utc_to_julian_day(utc_birth)
+    target_sun = normalize_angle(get_sun_longitude(birth_jd) - 88)
+    return utc_birth - timedelta(days=solve_design_days(birth_jd, target_sun))
 
 def calculate_gates(positions):
     """Convert planetary positions to gates."""
     gates = {}
     for planet, longitude in positions.items():
-        gate, line = get_gate_from_longitude(longitude)
+        gate, line, color, tone, base = lookup_gate(longitude)
         gates[planet] = {
             'gate': gate,
             'line': line,
+            'color': color,
+            'tone': tone,
+            'base': base,
             'longitude': longitude
         }
     return gates
 
 def calculate_natal_chart(birth_datetime, timezone_str='UTC'):
     """Calculate complete natal chart."""
+    # Convert once and work in Julian Days from here on
+    utc_birth = to_utc(birth_datetime, timezone_str)
+    birth_jd = utc_to_julian_day(utc_birth)
+    
     # Get personality positions (at birth)
-    if FLATLIB_AVAILABLE:
-        personality_positions = get_planetary_positions_flatlib(birth_datetime, timezone_str)
-    else:
-        personality_positions = get_planetary_positions_basic(birth_datetime, timezone_str)
+    personality_positions = get_positions_jd(birth_jd)
     
     # Get design date
-    design_dt = calculate_design_date(birth_datetime, timezone_str)
+    target_sun = normalize_angle(personality_positions['Sun'] - 88)
+    days_back = solve_design_days(birth_jd, target_sun)
+    design_dt = utc_birth - timedelta(days=days_back)
     
     # Get design positions
-    if FLATLIB_AVAILABLE:
-        design_positions = get_planetary_positions_flatlib(design_dt, 'UTC')
-    else:
-        design_positions = get_planetary_positions_basic(design_dt, 'UTC')
+    design_positions = get_positions_jd(birth_jd - days_back)
     
     # Convert to gates
     personality_gates = calculate_gates(personality_positions)
@@ -382,61 +422,52 @@ def calculate_transit_chart(transit_datetime=None, timezone_str='UTC'):
         'gates': gates
     }
 
+# The ingress calendar behind hd_calculations.TransitCache needs Swiss
+# Ephemeris, so here the shared transit chart is refreshed on a fixed interval
+TRANSIT_MAX_AGE = timedelta(minutes=1)
 
-# ============ GEOCODING ============
+_TRANSIT_CHART = None
+_TRANSIT_LOCK = threading.Lock()
 
-COMMON_LOCATIONS = {
-    "agrinio": {"lat": 38.6216, "lon": 21.4083, "tz": "Europe/Athens", "address": "Agrinio, Greece"},
-    "agrinio, greece": {"lat": 38.6216, "lon": 21.4083, "tz": "Europe/Athens", "address": "Agrinio, Greece"},
-    "athens": {"lat": 37.9838, "lon": 23.7275, "tz": "Europe/Athens", "address": "Athens, Greece"},
-    "athens, greece": {"lat": 37.9838, "lon": 23.7275, "tz": "Europe/Athens", "address": "Athens, Greece"},
-    "new york": {"lat": 40.7128, "lon": -74.0060, "tz": "America/New_York", "address": "New York, USA"},
-    "new york, usa": {"lat": 40.7128, "lon": -74.0060, "tz": "America/New_York", "address": "New York, USA"},
-    "london": {"lat": 51.5074, "lon": -0.1278, "tz": "Europe/London", "address": "London, UK"},
-    "london, uk": {"lat": 51.5074, "lon": -0.1278, "tz": "Europe/London", "address": "London, UK"},
-    "los angeles": {"lat": 34.0522, "lon": -118.2437, "tz": "America/Los_Angeles", "address": "Los Angeles, USA"},
-    "paris": {"lat": 48.8566, "lon": 2.3522, "tz": "Europe/Paris", "address": "Paris, France"},
-    "berlin": {"lat": 52.5200, "lon": 13.4050, "tz": "Europe/Berlin", "address": "Berlin, Germany"},
-    "tokyo": {"lat": 35.6762, "lon": 139.6503, "tz": "Asia/Tokyo", "address": "Tokyo, Japan"},
-    "sydney": {"lat": -33.8688, "lon": 151.2093, "tz": "Australia/Sydney", "address": "Sydney, Australia"},
-}
+def get_current_transit_chart():
+    """The current transit chart, shared by every session and recomputed after TRANSIT_MAX_AGE."""
+    global _TRANSIT_CHART
+    now = datetime.now(pytz.UTC)
+    with _TRANSIT_LOCK:
+        if _TRANSIT_CHART is None or now - _TRANSIT_CHART['datetime'] >= TRANSIT_MAX_AGE:
+            _TRANSIT_CHART = calculate_transit_chart(now, 'UTC')
+        return _TRANSIT_CHART
+
+
+# ============ GEOCODING ============
 
 def geocode_location(location_str):
-    """Geocode a location string."""
-    import time
-    try:
-        geolocator = Nominatim(
-            user_agent="HumanDesignCalculator/1.0",
-            timeout=10
-        )
-        time.sleep(1)
-        location = geolocator.geocode(location_str, language='en')
-        if location:
-            tf = TimezoneFinder()
-            timezone_str = tf.timezone_at(lat=location.latitude, lng=location.longitude)
-            return {
-                'latitude': location.latitude,
-                'longitude': location.longitude,
-                'address': location.address,
-                'timezone': timezone_str or 'UTC'
-            }
-    except Exception as e:
-        print(f"Geocoding error: {e}")
-    return None
+    """
+    Geocode a location string to get coordinates and timezone.
+    Cached and rate-limited through hd_geocoding; None when not found.
+    """
+    return get_geocoder().geocode(location_str)
 
 def geocode_location_with_fallback(location_str):
-    """Try common locations first, then API."""
-    location_lower = location_str.lower().strip()
-    if location_lower in COMMON_LOCATIONS:
-        loc = COMMON_LOCATIONS[location_lower]
-        return {
-            'latitude': loc['lat'],
-            'longitude': loc['lon'],
-            'address': loc['address'],
-            'timezone': loc['tz']
-        }
+    """
+    Try the offline gazetteer first, then fall back to geocoding API.
+    """
+    # Bundled city index (instant, no API call)
+    location = lookup_location(location_str)
+    if location:
+        return location
+    
+    # Try geocoding API
     return geocode_location(location_str)
 
+def suggest_locations(partial_location, limit=5):
+    """
+    Typeahead suggestions for a partly typed location from the offline
+    gazetteer, most likely first. Each suggestion's 'address' resolves
+    through geocode_location_with_fallback without a network call.
+    """
+    return gazetteer_suggestions(partial_location, limit)
+
 
 # ============ PROFILE NAMES ============
 
@@ -0,0 +1,159 @@
+"""
+Chebyshev-segment compressed ephemeris, in the style of the JPL DE files.
+
+Each body's longitude is split into fixed-length time segments and every
+segment is stored as a short Chebyshev series fitted to Swiss Ephemeris.
+The whole 1900-2100 range for all PLANETS bodies fits in a few MB and
+evaluates with NumPy for scalar or array JDs. The max error of each body
+is checked against Swiss Ephemeris at build time and stored in the file.
+
+Build locally with:
+    python hd_chebyshev.py [path]
+"""
+
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import swisseph as swe
+from numpy.polynomial import chebyshev
+
+from hd_calculations import PLANETS, datetime_to_julian
+
+CHEBYSHEV_EPHEMERIS_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'data', 'ephemeris_chebyshev.npz'
+)
+
+EPHEMERIS_START = datetime(1900, 1, 1)
+EPHEMERIS_END = datetime(2100, 1, 1)
+
+# (segment length in days, polynomial degree); every setting keeps the
+# fit within a couple of arcseconds of Swiss Ephemeris
+SEGMENTS = {
+    'Sun': (32, 10),
+    'Moon': (4, 12),
+    'North Node': (8, 12),
+    'Mercury': (8, 12),
+    'Venus': (16, 12),
+    'Mars': (16, 12),
+    'Jupiter': (32, 10),
+    'Saturn': (32, 10),
+    'Uranus': (64, 10),
+    'Neptune': (64, 10),
+    'Pluto': (64, 10),
+}
+ERROR_SAMPLES = 5000
+
+
+def _key(name):
+    return name.lower().replace(' ', '_')
+
+
+def fit_body(planet_id, start_jd, end_jd, segment_days, degree):
+    """Fit Chebyshev coefficients for one body; returns an (n_segments, degree + 1) array."""
+    n_segments = int(np.ceil((end_jd - start_jd) / segment_days))
+    # Twice as many nodes as coefficients for a least-squares fit
+    n_nodes = 2 * (degree + 1)
+    nodes = np.cos(np.pi * (np.arange(n_nodes) + 0.5) / n_nodes)[::-1]
+    seg_starts = start_jd + segment_days * np.arange(n_segments)
+    jds = seg_starts[:, None] + (nodes[None, :] + 1) / 2 * segment_days
+
+    longitudes = np.array([swe.calc_ut(jd, planet_id)[0][0] for jd in jds.ravel()])
+    longitudes = np.rad2deg(np.unwrap(np.deg2rad(longitudes.reshape(jds.shape)), axis=1))
+
+    vander = chebyshev.chebvander(nodes, degree)
+    coeffs, _, _, _ = np.linalg.lstsq(vander, longitudes.T, rcond=None)
+    coeffs = coeffs.T
+    coeffs[:, 0] %= 360.0
+    return coeffs
+
+
+def _clenshaw(coeffs, x):
+    b1 = np.zeros_like(x)
+    b2 = np.zeros_like(x)
+    for k in range(coeffs.shape[1] - 1, 0, -1):
+        b1, b2 = 2 * x * b1 - b2 + coeffs[:, k], b1
+    return x * b1 - b2 + coeffs[:, 0]
+
+
+def build_chebyshev_ephemeris(path=CHEBYSHEV_EPHEMERIS_PATH, start=EPHEMERIS_START, end=EPHEMERIS_END):
+    """Fit every body, measure its max error against Swiss Ephemeris and save."""
+    start_jd = datetime_to_julian(start)
+    end_jd = datetime_to_julian(end)
+    arrays = {
+        'start_jd': np.float64(start_jd),
+        'end_jd': np.float64(end_jd),
+        'bodies': np.array(list(PLANETS)),
+    }
+    rng = np.random.default_rng(0)
+
+    for name, planet_id in PLANETS.items():
+        segment_days, degree = SEGMENTS[name]
+        coeffs = fit_body(planet_id, start_jd, end_jd, segment_days, degree)
+
+        check_jds = rng.uniform(start_jd, end_jd, ERROR_SAMPLES)
+        expected = np.array([swe.calc_ut(jd, planet_id)[0][0] for jd in check_jds])
+        got = _evaluate(coeffs, start_jd, segment_days, check_jds)
+        max_error = float(np.abs((got - expected + 180) % 360 - 180).max())
+
+        key = _key(name)
+        arrays[f'{key}_coeffs'] = coeffs
+        arrays[f'{key}_segment_days'] = np.float64(segment_days)
+        arrays[f'{key}_max_error'] = np.float64(max_error)
+        print(f"{name}: {coeffs.shape[0]} segments x {degree + 1} coefficients, "
+              f"max error {max_error * 3600:.3f}\"", file=sys.stderr)
+
+    np.savez(path, **arrays)
+    return path
+
+
+def _evaluate(coeffs, start_jd, segment_days, jds):
+    position = (jds - start_jd) / segment_days
+    index = np.minimum(position.astype(np.int64), len(coeffs) - 1)
+    x = 2 * (position - index) - 1
+    return _clenshaw(coeffs[index], x) % 360.0
+
+
+class ChebyshevEphemeris:
+    """Evaluator for a file written by build_chebyshev_ephemeris."""
+
+    def __init__(self, path=CHEBYSHEV_EPHEMERIS_PATH):
+        with np.load(path) as data:
+            self.path = path
+            self.start_jd = float(data['start_jd'])
+            self.end_jd = float(data['end_jd'])
+            self.bodies = [str(name) for name in data['bodies']]
+            self.coeffs = {}
+            self.segment_days = {}
+            self.max_error = {}
+            for name in self.bodies:
+                key = _key(name)
+                self.coeffs[name] = data[f'{key}_coeffs']
+                self.segment_days[name] = float(data[f'{key}_segment_days'])
+                self.max_error[name] = float(data[f'{key}_max_error'])
+        self._by_id = {PLANETS[name]: name for name in self.bodies}
+
+    def longitudes(self, jds, body):
+        """Longitude of `body` for a scalar JD (returns a float) or an array of JDs."""
+        scalar = np.ndim(jds) == 0
+        jds = np.atleast_1d(np.asarray(jds, dtype=float))
+        if jds.size and (jds.min() < self.start_jd or jds.max() > self.end_jd):
+            raise ValueError("Julian day outside the Chebyshev ephemeris range")
+        result = _evaluate(self.coeffs[body], self.start_jd, self.segment_days[body], jds)
+        return float(result[0]) if scalar else result
+
+    def planet_position(self, jd, planet_id):
+        """Drop-in for get_planet_position; Swiss Ephemeris outside the fitted range."""
+        if not self.start_jd <= jd <= self.end_jd:
+            return swe.calc_ut(jd, planet_id)[0][0]
+        return self.longitudes(jd, self._by_id[planet_id])
+
+
+def main(path=CHEBYSHEV_EPHEMERIS_PATH):
+    build_chebyshev_ephemeris(path)
+    print(f"Wrote {path} ({os.path.getsize(path) / 1e6:.1f} MB)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -0,0 +1,243 @@
+"""
+Pluggable ephemeris backends.
+
+Every backend answers the same question, positions(jd_array, bodies),
+with an (N, len(bodies)) array of geocentric longitudes. Backends are
+registered with a speed/accuracy profile so a deployment can pick one
+at runtime, through the HD_EPHEMERIS_BACKEND environment variable or
+set_backend(), without editing code:
+
+    swisseph   Swiss Ephemeris via pyswisseph (reference accuracy)
+    flatlib    flatlib's ephemeris interface (mean lunar node)
+    basic      closed-form formulas, no dependencies (coarse)
+    table      memory-mapped interpolated table (hd_ephemeris_table)
+    chebyshev  Chebyshev-segment file (hd_chebyshev)
+
+The table-driven backends answer JDs outside their range with Swiss
+Ephemeris. Design-date solving in hd_calculations always uses Swiss
+Ephemeris; the backend supplies the chart positions.
+
+Profiles declare throughput in positions per second per core for array
+calls, and max error in degrees per body relative to Swiss Ephemeris.
+"""
+
+import os
+
+import numpy as np
+
+# Same column order as hd_calculations.BODY_NAMES
+BODIES = [
+    'Sun', 'Moon', 'North Node', 'Mercury', 'Venus', 'Mars', 'Jupiter',
+    'Saturn', 'Uranus', 'Neptune', 'Pluto', 'Earth', 'South Node'
+]
+# Bodies that are the opposite point of another body
+DERIVED_BODIES = {'Earth': 'Sun', 'South Node': 'North Node'}
+
+DEFAULT_BACKEND = 'swisseph'
+BACKEND_ENV_VAR = 'HD_EPHEMERIS_BACKEND'
+
+ARCSEC = 1 / 3600.0
+
+
+class EphemerisBackend:
+    """Base class: subclasses implement body_longitudes for non-derived bodies."""
+
+    name = None
+
+    def body_longitudes(self, jds, body):
+        raise NotImplementedError
+
+    def longitudes(self, jds, bodies):
+        """Dict of body -> longitude array; override when bodies are cheaper together."""
+        return {body: self.body_longitudes(jds, body) for body in bodies}
+
+    def positions(self, jds, bodies=BODIES):
+        """Longitudes for every JD (rows) and body (columns)."""
+        jds = np.atleast_1d(np.asarray(jds, dtype=float))
+        sources = list(dict.fromkeys(DERIVED_BODIES.get(body, body) for body in bodies))
+        computed = self.longitudes(jds, sources)
+        result = np.empty((len(jds), len(bodies)))
+        for col, body in enumerate(bodies):
+            if body in DERIVED_BODIES:
+                result[:, col] = (np.asarray(computed[DERIVED_BODIES[body]]) + 180.0) % 360.0
+            else:
+                result[:, col] = computed[body]
+        return result
+
+
+class SwissEphemerisBackend(EphemerisBackend):
+    name = 'swisseph'
+
+    def __init__(self):
+        import swisseph as swe
+        from hd_calculations import PLANETS
+        self._swe = swe
+        self._ids = PLANETS
+
+    def body_longitudes(self, jds, body):
+        calc_ut = self._swe.calc_ut
+        planet_id = self._ids[body]
+        return [calc_ut(jd, planet_id)[0][0] for jd in jds]
+
+
+class FlatlibBackend(EphemerisBackend):
+    name = 'flatlib'
+
+    def __init__(self):
+        from flatlib import const
+        from flatlib.ephem import swe as flatlib_swe
+        self._object_lon = flatlib_swe.sweObjectLon
+        self._ids = {
+            'Sun': const.SUN, 'Moon': const.MOON, 'North Node': const.NORTH_NODE,
+            'Mercury': const.MERCURY, 'Venus': const.VENUS, 'Mars': const.MARS,
+            'Jupiter': const.JUPITER, 'Saturn': const.SATURN, 'Uranus': const.URANUS,
+            'Neptune': const.NEPTUNE, 'Pluto': const.PLUTO,
+        }
+
+    def body_longitudes(self, jds, body):
+        object_id = self._ids[body]
+        return [self._object_lon(object_id, jd) for jd in jds]
+
+
+class BasicBackend(EphemerisBackend):
+    name = 'basic'
+
+    def __init__(self):
+        from hd_calculations_flatlib import get_planetary_positions_basic_array
+        self._positions = get_planetary_positions_basic_array
+
+    def longitudes(self, jds, bodies):
+        # One vectorized formula pass yields every body at once
+        matrix = self._positions(jds)
+        return {body: matrix[:, BODIES.index(body)] for body in bodies}
+
+    def positions(self, jds, bodies=BODIES):
+        matrix = self._positions(jds)
+        return matrix[:, [BODIES.index(body) for body in bodies]]
+
+    def body_longitudes(self, jds, body):
+        return self.longitudes(jds, [body])[body]
+
+
+class _RangeLimitedBackend(EphemerisBackend):
+    """Table-driven backend that hands JDs outside its range to Swiss Ephemeris."""
+
+    start_jd = end_jd = None
+
+    def in_range_longitudes(self, jds, body):
+        raise NotImplementedError
+
+    def body_longitudes(self, jds, body):
+        inside = (jds >= self.start_jd) & (jds <= self.end_jd)
+        if inside.all():
+            return self.in_range_longitudes(jds, body)
+        result = np.empty(len(jds))
+        if inside.any():
+            result[inside] = self.in_range_longitudes(jds[inside], body)
+        result[~inside] = get_backend('swisseph').body_longitudes(jds[~inside], body)
+        return result
+
+
+class TableBackend(_RangeLimitedBackend):
+    name = 'table'
+
+    def __init__(self):
+        from hd_ephemeris_table import get_ephemeris_table
+        self.table = get_ephemeris_table()
+        self.start_jd, self.end_jd = self.table.start_jd, self.table.end_jd
+
+    def in_range_longitudes(self, jds, body):
+        return self.table.longitudes(jds, body)
+
+
+class ChebyshevBackend(_RangeLimitedBackend):
+    name = 'chebyshev'
+
+    def __init__(self):
+        from hd_chebyshev import ChebyshevEphemeris
+        self.ephemeris = ChebyshevEphemeris()
+        self.start_jd, self.end_jd = self.ephemeris.start_jd, self.ephemeris.end_jd
+
+    def in_range_longitudes(self, jds, body):
+        return self.ephemeris.longitudes(jds, body)
+
+
+_REGISTRY = {}
+_INSTANCES = {}
+_selected = None
+
+
+def register_backend(name, factory, throughput, max_error):
+    """
+    Register a backend factory with its profile.
+
+    throughput is positions per second per core; max_error is degrees
+    relative to Swiss Ephemeris, either one number or a dict per body.
+    """
+    if not isinstance(max_error, dict):
+        max_error = {body: max_error for body in BODIES if body not in DERIVED_BODIES}
+    for derived, source in DERIVED_BODIES.items():
+        max_error.setdefault(derived, max_error[source])
+    _REGISTRY[name] = {
+        'factory': factory,
+        'throughput': throughput,
+        'max_error': max_error
+    }
+    _INSTANCES.pop(name, None)
+
+
+def backend_profiles():
+    """Declared throughput and per-body max error of every registered backend."""
+    return {
+        name: {'throughput': entry['throughput'], 'max_error': dict(entry['max_error'])}
+        for name, entry in _REGISTRY.items()
+    }
+
+
+def set_backend(name):
+    """Select the process-wide backend; None goes back to the environment/default."""
+    global _selected
+    if name is not None and name not in _REGISTRY:
+        raise ValueError(f"Unknown ephemeris backend: {name}")
+    _selected = name
+
+
+def get_backend(name=None):
+    """Backend instance by name, or the selected one (set_backend, env var, default)."""
+    name = name or _selected or os.environ.get(BACKEND_ENV_VAR) or DEFAULT_BACKEND
+    if name not in _REGISTRY:
+        raise ValueError(f"Unknown ephemeris backend: {name}")
+    if name not in _INSTANCES:
+        _INSTANCES[name] = _REGISTRY[name]['factory']()
+    return _INSTANCES[name]
+
+
+def is_available(name):
+    try:
+        get_backend(name)
+    except (ImportError, OSError, ValueError):
+        return False
+    return True
+
+
+def choose_backend(max_error, bodies=BODIES):
+    """Fastest available backend whose declared error for `bodies` is within max_error degrees."""
+    candidates = sorted(_REGISTRY.items(), key=lambda item: -item[1]['throughput'])
+    for name, entry in candidates:
+        if max(entry['max_error'][body] for body in bodies) <= max_error and is_available(name):
+            return get_backend(name)
+    raise ValueError(f"No available ephemeris backend within {max_error} degrees")
+
+
+register_backend('swisseph', SwissEphemerisBackend, throughput=15_000, max_error=0.0)
+# flatlib asks Swiss Ephemeris for the mean node; the true node differs by up to ~2 degrees
+register_backend('flatlib', FlatlibBackend, throughput=13_000, max_error={
+    'Sun': 0.0, 'Moon': 0.0, 'North Node': 2.0, 'Mercury': 0.0, 'Venus': 0.0,
+    'Mars': 0.0, 'Jupiter': 0.0, 'Saturn': 0.0, 'Uranus': 0.0, 'Neptune': 0.0, 'Pluto': 0.0,
+})
+register_backend('basic', BasicBackend, throughput=10_000_000, max_error={
+    'Sun': 0.02, 'Moon': 0.35, 'North Node': 2.0, 'Mercury': 180.0, 'Venus': 180.0,
+    'Mars': 60.0, 'Jupiter': 15.0, 'Saturn': 20.0, 'Uranus': 20.0, 'Neptune': 5.0, 'Pluto': 45.0,
+})
+register_backend('table', TableBackend, throughput=9_000_000, max_error=5 * ARCSEC)
+register_backend('chebyshev', ChebyshevBackend, throughput=5_000_000, max_error=4 * ARCSEC)
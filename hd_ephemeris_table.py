@@ -0,0 +1,210 @@
+"""
+Memory-mapped, interpolated ephemeris backend.
+
+A single binary file holds unwrapped geocentric longitudes for every body
+in PLANETS from 1900 to 2100: hourly for the Moon, daily for the rest.
+Lookups are cubic interpolation over four neighbouring samples, so no
+swe.calc_ut call is needed inside the table range. The file is opened
+with mmap in read-only mode, which lets every worker process share the
+same page-cache pages instead of holding its own copy.
+
+Layout: a JSON header padded to HEADER_SIZE bytes, followed by one
+float64 array per body. The header records each body's start JD, step,
+sample count, element offset and the max interpolation error measured
+against Swiss Ephemeris when the table was built.
+
+Build the table locally (no network needed) with:
+    python hd_ephemeris_table.py [path]
+"""
+
+import json
+import math
+import mmap
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import swisseph as swe
+
+from hd_calculations import PLANETS, datetime_to_julian
+
+EPHEMERIS_TABLE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'data', 'ephemeris_table.bin'
+)
+HEADER_SIZE = 4096
+MAGIC = 'hd-ephemeris-table/1'
+
+TABLE_START = datetime(1900, 1, 1)
+TABLE_END = datetime(2100, 1, 1)
+# Sample spacing in days; the Moon needs hourly samples, everything else daily
+STEPS = {name: (1.0 / 24 if name == 'Moon' else 1.0) for name in PLANETS}
+# Extra samples on both sides so 4-point interpolation covers the whole range
+PADDING = 3
+ERROR_SAMPLES = 2000
+
+
+def _cubic(p0, p1, p2, p3, t):
+    return (
+        -t * (t - 1) * (t - 2) / 6 * p0
+        + (t + 1) * (t - 1) * (t - 2) / 2 * p1
+        - (t + 1) * t * (t - 2) / 2 * p2
+        + (t + 1) * t * (t - 1) / 6 * p3
+    )
+
+
+def _unwrap(longitudes):
+    return np.rad2deg(np.unwrap(np.deg2rad(longitudes)))
+
+
+def build_ephemeris_table(path=EPHEMERIS_TABLE_PATH, start=TABLE_START, end=TABLE_END):
+    """Sample Swiss Ephemeris into a table file and record per-body error bounds."""
+    start_jd = datetime_to_julian(start)
+    end_jd = datetime_to_julian(end)
+    bodies = {}
+    arrays = []
+    offset = 0
+    rng = np.random.default_rng(0)
+
+    for name, planet_id in PLANETS.items():
+        step = STEPS[name]
+        first_jd = start_jd - PADDING * step
+        count = int(math.ceil((end_jd - start_jd) / step)) + 2 * PADDING + 1
+        jds = first_jd + step * np.arange(count)
+        longitudes = _unwrap([swe.calc_ut(jd, planet_id)[0][0] for jd in jds])
+
+        meta = {
+            'planet_id': planet_id,
+            'start_jd': first_jd,
+            'step': step,
+            'count': count,
+            'offset': offset
+        }
+        check_jds = rng.uniform(start_jd, end_jd, ERROR_SAMPLES)
+        expected = np.array([swe.calc_ut(jd, planet_id)[0][0] for jd in check_jds])
+        got = _interpolate(longitudes, meta, check_jds)
+        meta['max_error'] = float(np.abs((got - expected + 180) % 360 - 180).max())
+
+        bodies[name] = meta
+        arrays.append(longitudes)
+        offset += count
+        print(f"{name}: {count} samples, max error {meta['max_error'] * 3600:.3f}\"", file=sys.stderr)
+
+    header = json.dumps({
+        'magic': MAGIC,
+        'start_jd': start_jd,
+        'end_jd': end_jd,
+        'bodies': bodies
+    }).encode('utf-8')
+    if len(header) > HEADER_SIZE:
+        raise ValueError("Ephemeris table header does not fit in HEADER_SIZE")
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(header.ljust(HEADER_SIZE, b' '))
+        for longitudes in arrays:
+            f.write(longitudes.astype('<f8').tobytes())
+    os.replace(tmp_path, path)
+    return path
+
+
+def _interpolate(data, meta, jds):
+    x = (np.asarray(jds, dtype=float) - meta['start_jd']) / meta['step']
+    i = np.floor(x).astype(np.int64)
+    t = x - i
+    return _cubic(data[i - 1], data[i], data[i + 1], data[i + 2], t) % 360.0
+
+
+class EphemerisTable:
+    """Read-only view of a table file; safe to share between processes."""
+
+    def __init__(self, path=EPHEMERIS_TABLE_PATH):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = json.loads(self._mmap[:HEADER_SIZE].decode('utf-8'))
+        if header.get('magic') != MAGIC:
+            raise ValueError(f"{path} is not an ephemeris table")
+
+        self.path = path
+        self.start_jd = header['start_jd']
+        self.end_jd = header['end_jd']
+        self.bodies = header['bodies']
+        self.max_error = {name: meta['max_error'] for name, meta in self.bodies.items()}
+        self._by_id = {meta['planet_id']: name for name, meta in self.bodies.items()}
+        self._start = self.start_jd
+        self._end = self.end_jd
+
+        values = np.frombuffer(self._mmap, dtype='<f8', offset=HEADER_SIZE)
+        scalars = memoryview(self._mmap)[HEADER_SIZE:].cast('d')
+        self._arrays = {}
+        self._scalars = {}
+        # planet_id -> (start_jd, step, samples) for the scalar fast path
+        self._lookup = {}
+        for name, meta in self.bodies.items():
+            lo, hi = meta['offset'], meta['offset'] + meta['count']
+            self._arrays[name] = values[lo:hi]
+            self._scalars[name] = scalars[lo:hi]
+            self._lookup[meta['planet_id']] = (meta['start_jd'], meta['step'], self._scalars[name])
+
+    def covers(self, jd):
+        return self.start_jd <= jd <= self.end_jd
+
+    def longitude(self, jd, body):
+        """Longitude of one body at one JD, using plain floats for speed."""
+        if not self._start <= jd <= self._end:
+            raise ValueError("Julian day outside the ephemeris table range")
+        meta = self.bodies[body]
+        data = self._scalars[body]
+        x = (jd - meta['start_jd']) / meta['step']
+        i = int(x)
+        t = x - i
+        return _cubic(data[i - 1], data[i], data[i + 1], data[i + 2], t) % 360.0
+
+    def longitudes(self, jds, body):
+        """Vectorized longitudes of one body for an array of JDs."""
+        jds = np.asarray(jds, dtype=float)
+        if jds.size and (jds.min() < self.start_jd or jds.max() > self.end_jd):
+            raise ValueError("Julian day outside the ephemeris table range")
+        return _interpolate(self._arrays[body], self.bodies[body], jds)
+
+    def planet_position(self, jd, planet_id, max_error=None):
+        """
+        Drop-in replacement for hd_calculations.get_planet_position.
+
+        Falls back to swe.calc_ut outside the table range, or when the
+        body's measured interpolation error exceeds max_error (degrees).
+        """
+        entry = self._lookup.get(planet_id)
+        if (entry is None or not self._start <= jd <= self._end
+                or (max_error is not None and self.max_error[self._by_id[planet_id]] > max_error)):
+            return swe.calc_ut(jd, planet_id)[0][0]
+        start_jd, step, data = entry
+        x = (jd - start_jd) / step
+        i = int(x)
+        t = x - i
+        return _cubic(data[i - 1], data[i], data[i + 1], data[i + 2], t) % 360.0
+
+
+_TABLE = None
+
+
+def get_ephemeris_table(path=EPHEMERIS_TABLE_PATH):
+    """The process-wide table, opened on first use."""
+    global _TABLE
+    if _TABLE is None or _TABLE.path != path:
+        _TABLE = EphemerisTable(path)
+    return _TABLE
+
+
+def get_planet_position(jd, planet_id):
+    """Same signature as hd_calculations.get_planet_position, served from the table."""
+    return get_ephemeris_table().planet_position(jd, planet_id)
+
+
+def main(path=EPHEMERIS_TABLE_PATH):
+    build_ephemeris_table(path)
+    print(f"Wrote {path} ({os.path.getsize(path) / 1e6:.1f} MB)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
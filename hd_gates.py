@@ -0,0 +1,56 @@
+"""
+Gate, line, color, tone and base lookup shared by hd_calculations and
+hd_calculations_flatlib.
+
+The wheel starts at 358.25 degrees with gate 25 and every gate spans
+exactly 5.625 degrees, so there is nothing to search: a longitude is
+shifted to the wheel origin and split into 1/192 degree base units
+(64 gates x 6 lines x 6 colors x 6 tones x 5 bases = 69120 units).
+"""
+
+import numpy as np
+
+GATE_WHEEL_START = 358.25
+GATE_SIZE = 5.625
+
+# Gates in wheel order, starting at GATE_WHEEL_START
+GATE_ORDER = np.array([
+    25, 17, 21, 51, 42, 3, 27, 24, 2, 23, 8, 20, 16, 35, 45, 12,
+    15, 52, 39, 53, 62, 56, 31, 33, 7, 4, 29, 59, 40, 64, 47, 6,
+    46, 18, 48, 57, 32, 50, 28, 44, 1, 43, 14, 34, 9, 5, 26, 11,
+    10, 58, 38, 54, 61, 60, 41, 19, 13, 49, 30, 55, 37, 63, 22, 36,
+], dtype=np.int8)
+
+UNITS_PER_DEGREE = 192
+UNITS_PER_WHEEL = 360 * UNITS_PER_DEGREE
+_GATE_ORDER_LIST = GATE_ORDER.tolist()
+
+
+def lookup_gate(longitude):
+    """
+    Resolve longitudes to (gate, line, color, tone, base).
+
+    Accepts a scalar, returning plain ints, or an array of any shape,
+    returning int8 arrays of the same shape.
+    """
+    if np.ndim(longitude) == 0:
+        offset = (float(longitude) - GATE_WHEEL_START) % 360.0
+        units = min(int(offset * UNITS_PER_DEGREE), UNITS_PER_WHEEL - 1)
+        return (
+            _GATE_ORDER_LIST[units // 1080],
+            units // 180 % 6 + 1,
+            units // 30 % 6 + 1,
+            units // 5 % 6 + 1,
+            units % 5 + 1,
+        )
+
+    offset = (np.asarray(longitude, dtype=np.float64) - GATE_WHEEL_START) % 360.0
+    units = np.minimum((offset * UNITS_PER_DEGREE).astype(np.int32), UNITS_PER_WHEEL - 1)
+    return (
+        GATE_ORDER[units // 1080],
+        (units // 180 % 6 + 1).astype(np.int8),
+        (units // 30 % 6 + 1).astype(np.int8),
+        (units // 5 % 6 + 1).astype(np.int8),
+        (units % 5 + 1).astype(np.int8),
+    )
+
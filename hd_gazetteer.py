@@ -0,0 +1,462 @@
+"""
+Offline gazetteer: city name -> coordinates and timezone, no network.
+
+The bundled sources are data/gazetteer_cities.tsv (name, aliases,
+country code, latitude, longitude, population, timezone, region) and
+data/gazetteer_countries.tsv (code, name, aliases). A GeoNames dump
+(cities500.txt / cities15000.txt with countryInfo.txt, and
+admin1CodesASCII.txt for region names) can be used instead for full
+coverage:
+
+    python hd_gazetteer.py build [--cities cities15000.txt --countries countryInfo.txt --admin1 admin1CodesASCII.txt]
+    python hd_gazetteer.py lookup "Agrinio, Greece"
+
+Building writes a sorted index to data/gazetteer_index/ as plain .npy
+arrays that are memory-mapped on load:
+
+- every place's name and aliases, alone and followed by each name, alias
+  and code of its country ('athens', 'athens, greece', 'athens, gr'),
+  and, where its region is known, by the region with or without the
+  country ('portland, oregon', 'portland, or, usa'), folded to lowercase
+  ASCII (accents dropped, punctuation evened out);
+- the folded keys concatenated in sorted order, with offsets, and the
+  place each key points to;
+- per-place coordinates, population, timezone and display address.
+
+Exact and prefix lookups are binary searches over the mmapped keys,
+tens of microseconds each. Ties (London, UK / London, Canada) go to the most
+populous place. The index is rebuilt on first use when missing, built
+by an older version, or when the files it was built from have changed.
+"""
+
+import argparse
+import bisect
+import json
+import os
+import sys
+import threading
+import unicodedata
+
+import numpy as np
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+CITIES_PATH = os.path.join(DATA_DIR, 'gazetteer_cities.tsv')
+COUNTRIES_PATH = os.path.join(DATA_DIR, 'gazetteer_countries.tsv')
+INDEX_DIR = os.path.join(DATA_DIR, 'gazetteer_index')
+
+# Letters NFKD does not decompose into ASCII plus accents
+_EXTRA_FOLDS = str.maketrans({
+    'ł': 'l', 'ø': 'o', 'đ': 'd', 'ð': 'd', 'þ': 'th', 'æ': 'ae', 'œ': 'oe', 'ı': 'i'
+})
+_SEPARATORS = str.maketrans({'-': ' ', '.': ' ', "'": '', '’': '', '`': ''})
+
+_STRING_TABLES = ('keys', 'addresses', 'names', 'timezones', 'trigrams')
+_ARRAYS = (
+    'key_places', 'latitudes', 'longitudes', 'populations', 'timezone_ids',
+    'name_key_places', 'trigram_postings_offsets', 'trigram_postings'
+)
+
+# Bumped whenever the index layout changes, so older indexes are rebuilt
+INDEX_VERSION = 3
+
+# Share of a query's trigrams a name must contain to be a fuzzy match
+FUZZY_MIN_SHARE = 0.6
+
+
+def fold(text):
+    """Lookup form of a place name: 'Kraków ,Poland' -> 'krakow, poland'."""
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    text = text.translate(_EXTRA_FOLDS).translate(_SEPARATORS)
+    parts = [' '.join(part.split()) for part in text.split(',')]
+    return ', '.join(part for part in parts if part)
+
+
+def trigrams(key, complete=True):
+    """
+    Character trigrams of a folded key, padded with a leading space (and a
+    trailing one for complete names; a typed prefix is open-ended).
+    """
+    padded = f" {key} " if complete else f" {key}"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# ============ SOURCES ============
+
+def _rows(path):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip() and not line.startswith('#'):
+                yield line.rstrip('\n').split('\t')
+
+
+def read_countries(path=COUNTRIES_PATH):
+    """code -> (display name, [names and aliases]) from the bundled file or GeoNames countryInfo.txt."""
+    countries = {}
+    for fields in _rows(path):
+        if len(fields) >= 17:
+            code, name, aliases = fields[0], fields[4], []
+        else:
+            code, name = fields[0], fields[1]
+            aliases = fields[2].split('|') if len(fields) > 2 and fields[2] else []
+        countries[code] = (name, [name] + aliases)
+    return countries
+
+
+def read_admin1(path):
+    """'CC.code' -> [region names] from GeoNames admin1CodesASCII.txt."""
+    return {fields[0]: list(dict.fromkeys([fields[1], fields[2]])) for fields in _rows(path)}
+
+
+def read_cities(path=CITIES_PATH, admin1=None):
+    """
+    Yield (name, aliases, country code, lat, lon, population, timezone,
+    region names) from either format. GeoNames rows get region names only
+    from an `admin1` mapping (see read_admin1).
+    """
+    for fields in _rows(path):
+        if len(fields) >= 19:
+            # GeoNames: geonameid, name, asciiname, alternatenames, lat, lon, ...
+            aliases = [fields[2]] + [alias for alias in fields[3].split(',') if alias]
+            regions = (admin1 or {}).get(f'{fields[8]}.{fields[10]}', [])
+            yield (fields[1], aliases, fields[8], float(fields[4]), float(fields[5]),
+                   int(fields[14] or 0), fields[17], regions)
+        else:
+            name, aliases, code, lat, lon, population, timezone_str = fields[:7]
+            regions = fields[7] if len(fields) > 7 else ''
+            yield (name, [alias for alias in aliases.split('|') if alias], code,
+                   float(lat), float(lon), int(population), timezone_str,
+                   [region for region in regions.split('|') if region])
+
+
+# ============ INDEX ============
+
+def _string_table(strings):
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8).copy(), offsets
+
+
+class StringTable:
+    """Sequence view of strings stored as one byte blob plus offsets."""
+
+    def __init__(self, blob, offsets):
+        # memoryviews index an order of magnitude faster than ndarrays
+        self._blob = memoryview(np.ascontiguousarray(blob))
+        self._offsets = memoryview(np.ascontiguousarray(offsets, dtype=np.int64))
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def raw(self, i):
+        return self._blob[self._offsets[i]:self._offsets[i + 1]].tobytes()
+
+    def __getitem__(self, i):
+        return self.raw(i).decode('utf-8')
+
+
+class _RawKeys:
+    # bisect over the encoded keys without decoding them
+    def __init__(self, table):
+        self._table = table
+
+    def __len__(self):
+        return len(self._table)
+
+    def __getitem__(self, i):
+        return self._table.raw(i)
+
+
+def build_index(cities_path=CITIES_PATH, countries_path=COUNTRIES_PATH, admin1_path=None):
+    """Index arrays (dict of name -> ndarray) for the given sources."""
+    countries = read_countries(countries_path)
+    admin1 = read_admin1(admin1_path) if admin1_path else None
+    names, addresses, lats, lons, populations, tz_ids = [], [], [], [], [], []
+    timezones = {}
+    entries = set()
+    name_entries = set()
+    for place, (name, aliases, code, lat, lon, population, timezone_str, regions) in enumerate(
+            read_cities(cities_path, admin1)):
+        country_name, country_names = countries.get(code, (code, []))
+        names.append(name)
+        addresses.append(f"{name}, {country_name}" if country_name else name)
+        lats.append(lat)
+        lons.append(lon)
+        populations.append(population)
+        tz_ids.append(timezones.setdefault(timezone_str, len(timezones)))
+
+        place_keys = {fold(alias) for alias in [name] + aliases} - {''}
+        suffixes = {fold(country) for country in country_names + [code]} - {''}
+        region_keys = {fold(region) for region in regions} - {''}
+        for key in place_keys:
+            entries.add((key, place))
+            name_entries.add((key, place))
+            for suffix in suffixes:
+                entries.add((f"{key}, {suffix}", place))
+            for region in region_keys:
+                entries.add((f"{key}, {region}", place))
+                for suffix in suffixes:
+                    entries.add((f"{key}, {region}, {suffix}", place))
+
+    entries = sorted((key.encode('utf-8'), place) for key, place in entries)
+    key_blob, key_offsets = _string_table([key.decode('utf-8') for key, _ in entries])
+    # Trigram postings over bare names and aliases, for typo-tolerant suggestions
+    name_entries = sorted(name_entries)
+    postings = {}
+    for name_key_id, (key, _) in enumerate(name_entries):
+        for trigram in trigrams(key):
+            postings.setdefault(trigram, []).append(name_key_id)
+    trigram_list = sorted(postings, key=lambda t: t.encode('utf-8'))
+    posting_offsets = np.zeros(len(trigram_list) + 1, dtype=np.int64)
+    posting_offsets[1:] = np.cumsum([len(postings[t]) for t in trigram_list])
+
+    arrays = {
+        'key_places': np.array([place for _, place in entries], dtype=np.int32),
+        'name_key_places': np.array([place for _, place in name_entries], dtype=np.int32),
+        'trigram_postings_offsets': posting_offsets,
+        'trigram_postings': np.array(
+            [i for t in trigram_list for i in postings[t]], dtype=np.int32
+        ),
+        'latitudes': np.array(lats),
+        'longitudes': np.array(lons),
+        'populations': np.array(populations, dtype=np.int64),
+        'timezone_ids': np.array(tz_ids, dtype=np.int32),
+    }
+    for table, strings in (('keys', None), ('addresses', addresses), ('names', names),
+                           ('timezones', sorted(timezones, key=timezones.get)),
+                           ('trigrams', trigram_list)):
+        blob, offsets = (key_blob, key_offsets) if strings is None else _string_table(strings)
+        arrays[f'{table}_blob'] = blob
+        arrays[f'{table}_offsets'] = offsets
+    return arrays
+
+
+def _sources_stamp(cities_path, countries_path, admin1_path=None):
+    paths = [cities_path, countries_path] + ([admin1_path] if admin1_path else [])
+    return {path: os.path.getmtime(path) for path in paths}
+
+
+def write_index(arrays, index_dir=INDEX_DIR, sources=None):
+    os.makedirs(index_dir, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(index_dir, f'{name}.npy'), array)
+    # Written last: an index without meta.json is treated as missing
+    with open(os.path.join(index_dir, 'meta.json'), 'w') as f:
+        json.dump({'version': INDEX_VERSION, 'sources': sources or {}}, f)
+
+
+class Gazetteer:
+    """Lookups over index arrays, from build_index or memory-mapped from disk."""
+
+    def __init__(self, arrays):
+        self._arrays = arrays
+        for table in _STRING_TABLES:
+            setattr(self, table, StringTable(arrays[f'{table}_blob'], arrays[f'{table}_offsets']))
+        self._raw_keys = _RawKeys(self.keys)
+        self.key_places = arrays['key_places']
+        self.latitudes = arrays['latitudes']
+        self.longitudes = arrays['longitudes']
+        self.populations = arrays['populations']
+        self.timezone_ids = arrays['timezone_ids']
+        self.name_key_places = arrays['name_key_places']
+        self.trigram_postings_offsets = arrays['trigram_postings_offsets']
+        self.trigram_postings = arrays['trigram_postings']
+        self._key_places = memoryview(np.ascontiguousarray(self.key_places))
+        self._populations = memoryview(np.ascontiguousarray(self.populations))
+        self._trigram_ids = None
+
+    @classmethod
+    def load(cls, index_dir=INDEX_DIR):
+        names = list(_ARRAYS)
+        names += [f'{table}_{part}' for table in _STRING_TABLES for part in ('blob', 'offsets')]
+        return cls({name: np.load(os.path.join(index_dir, f'{name}.npy'), mmap_mode='r') for name in names})
+
+    def __len__(self):
+        return len(self.populations)
+
+    def place(self, index):
+        """Geocoding result for a place, shaped like geocode_location's."""
+        return {
+            'latitude': float(self.latitudes[index]),
+            'longitude': float(self.longitudes[index]),
+            'address': self.addresses[index],
+            'timezone': self.timezones[int(self.timezone_ids[index])],
+            'name': self.names[index],
+            'population': int(self.populations[index])
+        }
+
+    def _key_range(self, low, high):
+        first = bisect.bisect_left(self._raw_keys, low)
+        return first, bisect.bisect_left(self._raw_keys, high, lo=first)
+
+    def _ranked(self, first, last, limit):
+        if last - first > 256:
+            places = np.unique(self.key_places[first:last])
+            order = np.argsort(-self.populations[places], kind='stable')
+            return places[order[:limit]].tolist()
+        places = set(self._key_places[first:last])
+        return sorted(places, key=lambda p: (-self._populations[p], p))[:limit]
+
+    def exact(self, query, limit=10):
+        """Places whose folded name (optionally with country) equals the query, most populous first."""
+        key = fold(query).encode('utf-8')
+        if not key:
+            return []
+        first, last = self._key_range(key, key + b'\x00')
+        return self._ranked(first, last, limit)
+
+    def prefix(self, query, limit=10):
+        """Places with a folded key starting with the query, most populous first."""
+        key = fold(query).encode('utf-8')
+        if not key:
+            return []
+        first, last = self._key_range(key, key + b'\xff')
+        return self._ranked(first, last, limit)
+
+    def lookup(self, location_str):
+        """
+        Best place for a location string, or None.
+
+        'City', 'City, Country', 'City, Region' and 'City, Region, Country'
+        are matched exactly after folding. A region is only matched where
+        the index knows the place's region; otherwise the result is None and
+        callers fall back to online geocoding, since a same-named city
+        elsewhere would be a wrong guess.
+        """
+        places = self.exact(location_str, limit=1)
+        return self.place(places[0]) if places else None
+
+    def fuzzy(self, query, limit=10):
+        """
+        Places whose name or an alias shares most of the query's trigrams,
+        tolerating typos: best share first, then most populous.
+        """
+        key = fold(query).split(', ')[0]
+        query_trigrams = trigrams(key, complete=False)
+        if len(query_trigrams) < 2:
+            return []
+        if self._trigram_ids is None:
+            self._trigram_ids = {self.trigrams[i]: i for i in range(len(self.trigrams))}
+        offsets = self.trigram_postings_offsets
+        lists = [
+            self.trigram_postings[offsets[i]:offsets[i + 1]]
+            for i in (self._trigram_ids.get(t) for t in query_trigrams) if i is not None
+        ]
+        if not lists:
+            return []
+        name_keys, shared = np.unique(np.concatenate(lists), return_counts=True)
+        share = shared / len(query_trigrams)
+        keep = share >= FUZZY_MIN_SHARE
+        places = np.asarray(self.name_key_places)[name_keys[keep]]
+        share = share[keep]
+        order = np.lexsort((-np.asarray(self.populations)[places], -share))
+        return list(dict.fromkeys(places[order].tolist()))[:limit]
+
+    def _agrees(self, place, query):
+        # Every part typed after the name (region, country) is one of the place's
+        parts = fold(query).split(', ')[1:]
+        if not parts:
+            return True
+        key = ', '.join([fold(self.names[place])] + parts).encode('utf-8')
+        first, last = self._key_range(key, key + b'\x00')
+        return place in set(self._key_places[first:last])
+
+    def suggest(self, query, limit=5):
+        """
+        Typeahead suggestions for a partly typed location: exact matches,
+        then completions of the typed prefix, then typo-tolerant matches,
+        each ranked by population. Each suggestion is a place() dict plus
+        'exact' (the query names it fully) and 'agrees' (any region or
+        country typed after the name is the place's, so 'Paris, Texas'
+        does not agree with Paris, France).
+        """
+        exact = self.exact(query, limit)
+        places = list(exact)
+        for candidates in (self.prefix, self.fuzzy):
+            if len(places) >= limit:
+                break
+            places += [p for p in candidates(query, limit) if p not in places]
+        return [
+            dict(self.place(p), exact=p in exact, agrees=p in exact or self._agrees(p, query))
+            for p in places[:limit]
+        ]
+
+
+_GAZETTEER = None
+_GAZETTEER_LOCK = threading.Lock()
+
+
+def _index_is_current(index_dir):
+    # Current while every source it was built from is unchanged, so an
+    # index built from a GeoNames dump is kept
+    try:
+        with open(os.path.join(index_dir, 'meta.json')) as f:
+            meta = json.load(f)
+        sources = meta['sources']
+        return meta.get('version') == INDEX_VERSION and bool(sources) and all(
+            os.path.getmtime(path) == mtime for path, mtime in sources.items()
+        )
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+def get_gazetteer(index_dir=INDEX_DIR, cities_path=CITIES_PATH, countries_path=COUNTRIES_PATH):
+    """
+    The process-wide gazetteer, memory-mapped from index_dir; the index
+    is built from the bundled sources first if missing or stale. Where index_dir cannot be
+    written the index is kept in memory.
+    """
+    global _GAZETTEER
+    with _GAZETTEER_LOCK:
+        if _GAZETTEER is None:
+            if not _index_is_current(index_dir):
+                arrays = build_index(cities_path, countries_path)
+                try:
+                    write_index(arrays, index_dir, _sources_stamp(cities_path, countries_path))
+                except OSError:
+                    _GAZETTEER = Gazetteer(arrays)
+                    return _GAZETTEER
+            _GAZETTEER = Gazetteer.load(index_dir)
+    return _GAZETTEER
+
+
+def lookup_location(location_str):
+    """Offline geocoding result for a location string, or None if not in the gazetteer."""
+    return get_gazetteer().lookup(location_str)
+
+
+def suggest_locations(query, limit=5):
+    """Top `limit` typeahead suggestions for a partly typed location (see Gazetteer.suggest)."""
+    return get_gazetteer().suggest(query, limit)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline gazetteer")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="build the index")
+    build.add_argument('--cities', default=CITIES_PATH, help="bundled TSV or GeoNames cities*.txt")
+    build.add_argument('--countries', default=COUNTRIES_PATH, help="bundled TSV or GeoNames countryInfo.txt")
+    build.add_argument('--admin1', help="GeoNames admin1CodesASCII.txt, for region names")
+    build.add_argument('--out', default=INDEX_DIR)
+    lookup = commands.add_parser('lookup', help="look up a location")
+    lookup.add_argument('location')
+    lookup.add_argument('--suggest', action='store_true', help="list typeahead suggestions")
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        arrays = build_index(args.cities, args.countries, args.admin1)
+        write_index(arrays, args.out, _sources_stamp(args.cities, args.countries, args.admin1))
+        print(f"{len(arrays['populations'])} places, {len(arrays['key_places'])} keys -> {args.out}",
+              file=sys.stderr)
+    else:
+        gazetteer = get_gazetteer()
+        if args.suggest:
+            for place in gazetteer.suggest(args.location):
+                print(json.dumps(place, ensure_ascii=False))
+        else:
+            print(json.dumps(gazetteer.lookup(args.location), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
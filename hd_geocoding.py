@@ -0,0 +1,269 @@
+"""
+Geocoding with a persistent cache, a shared rate limiter and one
+TimezoneFinder per process.
+
+Lookups go through Geocoder.geocode:
+
+1. the location is normalized (case, accents kept, whitespace and comma
+   spacing collapsed) into the cache key;
+2. the SQLite cache answers hits, including remembered misses;
+3. otherwise the backend geocoder is called once a token is available
+   from the process-wide token bucket (Nominatim allows one request per
+   second), and its answer, found or not, is stored.
+
+The backend is any callable mapping a query string to
+(latitude, longitude, address) or None, so tests and offline runs can
+inject a stub:
+
+    set_geocoder(Geocoder(backend=lambda query: (37.98, 23.73, 'Athens'),
+                          cache=GeocodeCache(':memory:')))
+
+Transient backend errors are not cached. The cache lives in
+data/geocode_cache.sqlite unless HD_GEOCODE_CACHE points elsewhere.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+GEOCODE_CACHE_PATH = os.environ.get(
+    'HD_GEOCODE_CACHE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'geocode_cache.sqlite')
+)
+
+USER_AGENT = "HumanDesignCalculator/1.0 (Educational Project)"
+
+# Nominatim usage policy: at most one request per second
+REQUESTS_PER_SECOND = 1.0
+# Remembered misses are retried after a week
+NEGATIVE_TTL = 7 * 24 * 3600
+
+
+def normalize_location(location_str):
+    """Cache key for a location: 'Athens ,  Greece ' -> 'athens, greece'."""
+    text = unicodedata.normalize('NFKC', location_str).casefold()
+    parts = [' '.join(part.split()) for part in text.split(',')]
+    return ', '.join(part for part in parts if part)
+
+
+# ============ TIMEZONES ============
+
+_TIMEZONE_FINDER = None
+_TIMEZONE_FINDER_LOCK = threading.Lock()
+
+
+def get_timezone_finder():
+    """The process-wide TimezoneFinder; loading its data is the slow part."""
+    global _TIMEZONE_FINDER
+    with _TIMEZONE_FINDER_LOCK:
+        if _TIMEZONE_FINDER is None:
+            from timezonefinder import TimezoneFinder
+            _TIMEZONE_FINDER = TimezoneFinder()
+    return _TIMEZONE_FINDER
+
+
+def timezone_at(latitude, longitude):
+    return get_timezone_finder().timezone_at(lat=latitude, lng=longitude) or 'UTC'
+
+
+# ============ RATE LIMITING ============
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, holding at most
+    `capacity`. acquire() takes one token, waiting for it if needed.
+    """
+
+    def __init__(self, rate=REQUESTS_PER_SECOND, capacity=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self):
+        """Take a token if one is available now."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def acquire(self, timeout=None):
+        """Take a token, waiting up to `timeout` seconds (forever if None)."""
+        deadline = None if timeout is None else self._clock() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and self._clock() + wait > deadline:
+                return False
+            self._sleep(wait)
+
+
+# Shared by every session of the process
+NOMINATIM_LIMITER = TokenBucket()
+
+
+# ============ CACHE ============
+
+class GeocodeCache:
+    """
+    SQLite cache of geocoding results by normalized key. Misses are
+    stored too (negative caching) and expire after negative_ttl seconds.
+    """
+
+    def __init__(self, path=GEOCODE_CACHE_PATH, negative_ttl=NEGATIVE_TTL):
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+        except sqlite3.OperationalError:
+            # Read-only deployments still get a per-process cache
+            self._db = sqlite3.connect(':memory:', check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                " key TEXT PRIMARY KEY, latitude REAL, longitude REAL,"
+                " address TEXT, timezone TEXT, updated REAL NOT NULL)"
+            )
+
+    def get(self, key):
+        """(hit, result): result is the cached dict, or None for a remembered miss."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT latitude, longitude, address, timezone, updated FROM geocode WHERE key = ?",
+                (key,)
+            ).fetchone()
+        if row is None:
+            return False, None
+        latitude, longitude, address, timezone_str, updated = row
+        if timezone_str is None:
+            if time.time() - updated > self.negative_ttl:
+                return False, None
+            return True, None
+        return True, {
+            'latitude': latitude,
+            'longitude': longitude,
+            'address': address,
+            'timezone': timezone_str
+        }
+
+    def put(self, key, result):
+        result = result or {}
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?, ?, ?)",
+                (key, result.get('latitude'), result.get('longitude'),
+                 result.get('address'), result.get('timezone'), time.time())
+            )
+
+    def clear(self):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM geocode")
+
+
+# ============ GEOCODER ============
+
+class NominatimBackend:
+    """OpenStreetMap Nominatim through geopy, one client per instance."""
+
+    def __init__(self, user_agent=USER_AGENT, timeout=10):
+        from geopy.geocoders import Nominatim
+        self._client = Nominatim(user_agent=user_agent, timeout=timeout)
+
+    def __call__(self, query):
+        location = self._client.geocode(query, language='en')
+        if location is None:
+            return None
+        return location.latitude, location.longitude, location.address
+
+
+class Geocoder:
+    """
+    Cached, rate-limited geocoding. backend defaults to Nominatim (created
+    on first use), cache to the SQLite file, limiter to the shared bucket.
+    """
+
+    def __init__(self, backend=None, cache=None, limiter=None):
+        self._backend = backend
+        self._cache = cache if cache is not None else GeocodeCache()
+        self._limiter = limiter if limiter is not None else NOMINATIM_LIMITER
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        with self._lock:
+            if self._backend is None:
+                self._backend = NominatimBackend()
+        return self._backend
+
+    def _queries(self, location_str):
+        # Fall back to just the city name when the full string is not found
+        yield location_str
+        if ',' in location_str:
+            yield location_str.split(',')[0].strip()
+
+    def geocode(self, location_str):
+        """Dict with latitude, longitude, address and timezone, or None."""
+        key = normalize_location(location_str)
+        if not key:
+            return None
+        hit, result = self._cache.get(key)
+        if hit:
+            return result
+
+        try:
+            for query in self._queries(location_str.strip()):
+                self._limiter.acquire()
+                found = self.backend(query)
+                if found:
+                    latitude, longitude, address = found
+                    result = {
+                        'latitude': latitude,
+                        'longitude': longitude,
+                        'address': address,
+                        'timezone': timezone_at(latitude, longitude)
+                    }
+                    break
+        except Exception as e:
+            # Network errors and the like say nothing about the location: not cached
+            print(f"Geocoding error: {e}")
+            return None
+
+        self._cache.put(key, result)
+        return result
+
+
+_GEOCODER = None
+_GEOCODER_LOCK = threading.Lock()
+
+
+def get_geocoder():
+    """The process-wide Geocoder, created on first use."""
+    global _GEOCODER
+    with _GEOCODER_LOCK:
+        if _GEOCODER is None:
+            _GEOCODER = Geocoder()
+    return _GEOCODER
+
+
+def set_geocoder(geocoder):
+    """Replace the process-wide Geocoder, e.g. with a stub-backed one."""
+    global _GEOCODER
+    with _GEOCODER_LOCK:
+        _GEOCODER = geocoder
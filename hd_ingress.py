@@ -0,0 +1,128 @@
+"""
+Gate and line ingress calendar.
+
+Finds the exact UTC instants at which bodies enter a new gate or line,
+with direction, by root-finding against the wheel boundaries with
+hd_calculations.find_longitude_crossings instead of sampling positions
+at fixed steps. Intervals are split at stations, so retrograde
+re-entries are reported as separate ingresses.
+
+Usage:
+    python hd_ingress.py START END [--level gate|line] [--bodies Sun,Moon,...]
+"""
+
+import argparse
+import sys
+from datetime import datetime
+
+import pytz
+
+from hd_calculations import (
+    OPPOSITE_BODIES, PLANETS, datetime_to_julian, find_longitude_crossings, julian_to_datetime
+)
+from hd_gates import GATE_SIZE, GATE_WHEEL_START, lookup_gate
+
+INGRESS_BODIES = list(PLANETS) + list(OPPOSITE_BODIES)
+
+LEVEL_SIZES = {
+    'gate': GATE_SIZE,
+    'line': GATE_SIZE / 6
+}
+
+# Root-finding tolerance in days (~0.01 s)
+TIME_TOLERANCE = 1e-7
+
+
+def _to_jd(value):
+    if isinstance(value, datetime):
+        return datetime_to_julian(value, 'UTC')
+    return float(value)
+
+
+def level_boundaries(level):
+    """Wheel boundary longitudes of every gate or line."""
+    size = LEVEL_SIZES[level]
+    return [(GATE_WHEEL_START + k * size) % 360.0 for k in range(round(360.0 / size))]
+
+
+def find_ingresses(start, end, bodies=None, level='line'):
+    """
+    Every gate or line ingress between start and end (datetimes or JDs).
+
+    Returns events sorted by time, each a dict with the body, the JD and
+    UTC datetime of the ingress, the gate/line entered and left, and the
+    direction of motion ('direct' or 'retrograde').
+    """
+    if level not in LEVEL_SIZES:
+        raise ValueError(f"Unknown ingress level: {level}")
+    bodies = INGRESS_BODIES if bodies is None else list(bodies)
+    unknown = [body for body in bodies if body not in INGRESS_BODIES]
+    if unknown:
+        raise ValueError(f"Unknown bodies: {', '.join(unknown)}")
+
+    start_jd, end_jd = _to_jd(start), _to_jd(end)
+    boundaries = level_boundaries(level)
+    half = LEVEL_SIZES[level] / 2
+
+    # Opposite bodies reuse the crossings of the body they mirror; their
+    # boundaries are 180 degrees (a whole number of lines) away
+    sources = {}
+    for body in bodies:
+        sources.setdefault(OPPOSITE_BODIES.get(body, body), []).append(body)
+
+    events = []
+    for source, reported in sources.items():
+        crossings = find_longitude_crossings(source, boundaries, start_jd, end_jd, TIME_TOLERANCE)
+        for jd, boundary, sign in crossings:
+            for body in reported:
+                point = boundary + 180.0 if body in OPPOSITE_BODIES else boundary
+                gate, line, _, _, _ = lookup_gate(point + sign * half)
+                from_gate, from_line, _, _, _ = lookup_gate(point - sign * half)
+                events.append({
+                    'body': body,
+                    'jd': jd,
+                    'datetime': julian_to_datetime(jd),
+                    'gate': gate,
+                    'line': line,
+                    'from_gate': from_gate,
+                    'from_line': from_line,
+                    'direction': 'direct' if sign > 0 else 'retrograde',
+                    'longitude': point % 360.0
+                })
+
+    events.sort(key=lambda event: (event['jd'], INGRESS_BODIES.index(event['body'])))
+    return events
+
+
+def next_ingress(start, bodies=None, level='line', horizon=1.0):
+    """First ingress after start within `horizon` days, or None."""
+    start_jd = _to_jd(start)
+    events = find_ingresses(start_jd, start_jd + horizon, bodies, level)
+    return events[0] if events else None
+
+
+def format_ingress(event, level='line'):
+    when = event['datetime'].strftime('%Y-%m-%d %H:%M:%S')
+    arrow = '' if event['direction'] == 'direct' else ' (Rx)'
+    if level == 'gate':
+        return f"{when} UTC  {event['body']:<10} -> Gate {event['gate']}{arrow}"
+    return f"{when} UTC  {event['body']:<10} -> {event['gate']}.{event['line']}{arrow}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gate/line ingress calendar")
+    parser.add_argument('start', help="start date, YYYY-MM-DD (UTC)")
+    parser.add_argument('end', help="end date, YYYY-MM-DD (UTC)")
+    parser.add_argument('--level', choices=sorted(LEVEL_SIZES), default='gate')
+    parser.add_argument('--bodies', help="comma-separated bodies (default: all)")
+    args = parser.parse_args(argv)
+
+    start = pytz.UTC.localize(datetime.strptime(args.start, '%Y-%m-%d'))
+    end = pytz.UTC.localize(datetime.strptime(args.end, '%Y-%m-%d'))
+    bodies = args.bodies.split(',') if args.bodies else None
+    for event in find_ingresses(start, end, bodies, args.level):
+        print(format_ingress(event, args.level))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
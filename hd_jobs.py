@@ -0,0 +1,335 @@
+"""
+Sharded sweep jobs over a shared directory.
+
+A job splits a birth-time grid or a cohort of birth times into numbered
+shards that any number of nodes can work on independently, as long as
+they see the same directory (NFS, a mounted bucket, ...):
+
+    python hd_jobs.py create JOB_DIR --start 1900-01-01 --end 2100-01-01 --step 5
+    python hd_jobs.py create JOB_DIR --cohort births.txt
+    python hd_jobs.py work JOB_DIR          # on every node, as often as wanted
+    python hd_jobs.py status JOB_DIR
+    python hd_jobs.py merge JOB_DIR
+    python hd_jobs.py local JOB_DIR --nodes 4   # local multi-process stand-in
+
+Layout of JOB_DIR:
+
+    job.json             spec: id, births, shard size and count
+    cohort.npy           birth JDs of a cohort job
+    claims/NNNNNN.lock   shard claimed by a node (node id and claim time)
+    shards/NNNNNN.json   finished shard: partial histograms (hd_sweep)
+    result.json          merged histograms
+
+Shard i always holds births [i * shard_size, (i + 1) * shard_size) of the
+job, so the partition depends only on the spec. Claims are created
+exclusively and results are written under a temporary name then renamed,
+so a crashed node never leaves a half-written result. A claim older than
+the lease with no result belongs to a lost node and is taken over; if
+two nodes race for the same stale claim the shard may be computed twice,
+which is harmless since its result is deterministic. Merging only reads
+finished shards and always produces the same result.json, so it can be
+rerun at any time.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import socket
+import sys
+import time
+import uuid
+from datetime import datetime
+from multiprocessing import Process
+
+import numpy as np
+
+from hd_calculations import datetime_to_julian
+from hd_sweep import chunk_histograms, merge_histograms, sweep_spec, write_json
+
+JOB_FILE = 'job.json'
+COHORT_FILE = 'cohort.npy'
+RESULT_FILE = 'result.json'
+
+# Births per shard: about a year of 5-minute births
+SHARD_SIZE = 100_000
+# Seconds after which an unfinished claim is considered lost
+LEASE_SECONDS = 3600
+
+
+def _shard_name(index):
+    return f'{index:06d}'
+
+
+def _claim_path(job_dir, index):
+    return os.path.join(job_dir, 'claims', _shard_name(index) + '.lock')
+
+
+def _shard_path(job_dir, index):
+    return os.path.join(job_dir, 'shards', _shard_name(index) + '.json')
+
+
+def _job_id(spec, cohort=None):
+    digest = hashlib.sha256(json.dumps(spec, sort_keys=True).encode())
+    if cohort is not None:
+        digest.update(np.ascontiguousarray(cohort, dtype='<f8').tobytes())
+    return digest.hexdigest()[:16]
+
+
+def create_job(job_dir, start=None, end=None, step_minutes=5.0, cohort_jds=None,
+               shard_size=SHARD_SIZE):
+    """
+    Write the spec of a grid job (start/end datetimes in UTC, step in
+    minutes) or a cohort job (array of birth JDs) to job_dir.
+
+    Creating the same job again is a no-op; a different job in the same
+    directory is an error.
+    """
+    if cohort_jds is not None:
+        cohort = np.asarray(cohort_jds, dtype=float)
+        spec = {'kind': 'cohort', 'count': len(cohort)}
+    else:
+        cohort = None
+        grid = sweep_spec(start, end, step_minutes)
+        spec = {
+            'kind': 'grid',
+            'start': grid['start'],
+            'end': grid['end'],
+            'step_minutes': step_minutes,
+            'start_jd': grid['start_jd'],
+            'step': grid['step'],
+            'count': grid['count']
+        }
+    if spec['count'] == 0:
+        raise ValueError("Job has no births")
+    spec['shard_size'] = shard_size
+    spec['shards'] = -(-spec['count'] // shard_size)
+    spec['id'] = _job_id(spec, cohort)
+
+    job_path = os.path.join(job_dir, JOB_FILE)
+    if os.path.exists(job_path):
+        existing = load_job(job_dir)
+        if existing['id'] != spec['id']:
+            raise ValueError(f"{job_dir} already holds job {existing['id']}")
+        return existing
+
+    for sub in ('claims', 'shards'):
+        os.makedirs(os.path.join(job_dir, sub), exist_ok=True)
+    if cohort is not None:
+        tmp_path = os.path.join(job_dir, COHORT_FILE + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.save(f, cohort)
+        os.replace(tmp_path, os.path.join(job_dir, COHORT_FILE))
+    write_json(job_path, spec)
+    return spec
+
+
+def load_job(job_dir):
+    with open(os.path.join(job_dir, JOB_FILE)) as f:
+        return json.load(f)
+
+
+def shard_jds(job_dir, spec, index):
+    """Birth JDs of one shard."""
+    if not 0 <= index < spec['shards']:
+        raise IndexError(f"Shard {index} out of range")
+    first = index * spec['shard_size']
+    last = min(first + spec['shard_size'], spec['count'])
+    if spec['kind'] == 'cohort':
+        cohort = np.load(os.path.join(job_dir, COHORT_FILE), mmap_mode='r')
+        return np.array(cohort[first:last])
+    return spec['start_jd'] + spec['step'] * np.arange(first, last)
+
+
+def is_done(job_dir, index):
+    return os.path.exists(_shard_path(job_dir, index))
+
+
+def claim_shard(job_dir, index, node_id, lease=LEASE_SECONDS):
+    """
+    Try to take a shard for node_id. Returns False if it is finished or
+    held by another node within its lease.
+    """
+    if is_done(job_dir, index):
+        return False
+    path = _claim_path(job_dir, index)
+    claim = json.dumps({'node': node_id, 'time': time.time()})
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        try:
+            age = time.time() - os.path.getmtime(path)
+        except FileNotFoundError:
+            return claim_shard(job_dir, index, node_id, lease)
+        if age < lease:
+            return False
+        # Lost node: replace its claim, then check that this node won any race
+        tmp_path = f'{path}.{node_id}'
+        with open(tmp_path, 'w') as f:
+            f.write(claim)
+        os.replace(tmp_path, path)
+        with open(path) as f:
+            return json.load(f)['node'] == node_id
+    with os.fdopen(fd, 'w') as f:
+        f.write(claim)
+    return True
+
+
+def run_shard(job_dir, spec, index, node_id):
+    data = chunk_histograms(shard_jds(job_dir, spec, index))
+    data.update({'job': spec['id'], 'shard': index, 'node': node_id})
+    write_json(_shard_path(job_dir, index), data)
+    return data
+
+
+def default_node_id():
+    return f'{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}'
+
+
+def run_node(job_dir, node_id=None, lease=LEASE_SECONDS, max_shards=None):
+    """
+    Work through unfinished shards until none can be claimed.
+
+    Nodes start at different shards (by node id) to avoid contending for
+    the same claims. Returns the indices this node completed.
+    """
+    node_id = node_id or default_node_id()
+    spec = load_job(job_dir)
+    n = spec['shards']
+    offset = int(hashlib.sha256(node_id.encode()).hexdigest(), 16) % n
+    completed = []
+    for step in range(n):
+        if max_shards is not None and len(completed) >= max_shards:
+            break
+        index = (offset + step) % n
+        if not claim_shard(job_dir, index, node_id, lease):
+            continue
+        run_shard(job_dir, spec, index, node_id)
+        completed.append(index)
+        print(f"{node_id}: shard {index} done", file=sys.stderr)
+    return completed
+
+
+def job_status(job_dir, lease=LEASE_SECONDS):
+    """Shard indices by state: done, claimed (within the lease), stale and pending."""
+    spec = load_job(job_dir)
+    status = {'done': [], 'claimed': [], 'stale': [], 'pending': []}
+    now = time.time()
+    for index in range(spec['shards']):
+        if is_done(job_dir, index):
+            status['done'].append(index)
+            continue
+        try:
+            age = now - os.path.getmtime(_claim_path(job_dir, index))
+        except FileNotFoundError:
+            status['pending'].append(index)
+            continue
+        status['claimed' if age < lease else 'stale'].append(index)
+    return status
+
+
+def merge_job(job_dir, allow_partial=False):
+    """
+    Merge finished shards into result.json and return it.
+
+    Unless allow_partial, every shard must be finished. The output only
+    depends on the shard files, so merging again gives the same result.
+    """
+    spec = load_job(job_dir)
+    done = [index for index in range(spec['shards']) if is_done(job_dir, index)]
+    if len(done) < spec['shards'] and not allow_partial:
+        raise ValueError(f"{spec['shards'] - len(done)} of {spec['shards']} shards not finished")
+
+    def parts():
+        for index in done:
+            with open(_shard_path(job_dir, index)) as f:
+                data = json.load(f)
+            if data['job'] != spec['id']:
+                raise ValueError(f"Shard {index} belongs to job {data['job']}")
+            yield data
+
+    result = {'job': spec, 'shards_merged': len(done), **merge_histograms(parts())}
+    write_json(os.path.join(job_dir, RESULT_FILE), result)
+    return result
+
+
+def run_local_cluster(job_dir, nodes=2, lease=LEASE_SECONDS):
+    """Run `nodes` worker processes on this machine against job_dir, then merge."""
+    workers = [
+        Process(target=run_node, args=(job_dir, f'local-{i}', lease))
+        for i in range(nodes)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return merge_job(job_dir)
+
+
+def _read_cohort(path):
+    """Birth JDs from a text file of UTC 'YYYY-MM-DD HH:MM' lines or bare JDs."""
+    jds = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                jds.append(float(line))
+            except ValueError:
+                jds.append(datetime_to_julian(datetime.fromisoformat(line), 'UTC'))
+    return np.array(jds)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sharded sweep jobs over a shared directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    create = commands.add_parser('create', help="write a job spec")
+    create.add_argument('job_dir')
+    create.add_argument('--start', help="grid start, YYYY-MM-DD (UTC)")
+    create.add_argument('--end', help="grid end, YYYY-MM-DD (UTC, exclusive)")
+    create.add_argument('--step', type=float, default=5.0, help="grid step in minutes")
+    create.add_argument('--cohort', help="file of birth times, one UTC datetime or JD per line")
+    create.add_argument('--shard-size', type=int, default=SHARD_SIZE)
+
+    for name, help_text in (('work', "process shards until none are left"),
+                            ('status', "show shard states"),
+                            ('merge', "merge finished shards"),
+                            ('local', "run a local multi-process cluster")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('job_dir')
+        command.add_argument('--lease', type=float, default=LEASE_SECONDS,
+                             help="seconds before an unfinished claim is taken over")
+    commands.choices['work'].add_argument('--node-id')
+    commands.choices['merge'].add_argument('--partial', action='store_true',
+                                           help="merge even if shards are missing")
+    commands.choices['local'].add_argument('--nodes', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    if args.command == 'create':
+        if args.cohort:
+            spec = create_job(args.job_dir, cohort_jds=_read_cohort(args.cohort),
+                              shard_size=args.shard_size)
+        elif args.start and args.end:
+            spec = create_job(args.job_dir, datetime.strptime(args.start, '%Y-%m-%d'),
+                              datetime.strptime(args.end, '%Y-%m-%d'), args.step,
+                              shard_size=args.shard_size)
+        else:
+            parser.error("create needs --start and --end, or --cohort")
+        print(f"job {spec['id']}: {spec['count']} births in {spec['shards']} shards", file=sys.stderr)
+    elif args.command == 'work':
+        run_node(args.job_dir, args.node_id, args.lease)
+    elif args.command == 'status':
+        for state, indices in job_status(args.job_dir, args.lease).items():
+            print(f"{state}: {len(indices)}")
+    elif args.command == 'merge':
+        result = merge_job(args.job_dir, args.partial)
+        print(f"{result['samples']} births from {result['shards_merged']} shards", file=sys.stderr)
+    elif args.command == 'local':
+        result = run_local_cluster(args.job_dir, args.nodes, args.lease)
+        print(f"{result['samples']} births from {result['shards_merged']} shards", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+"""
+Reverse chart search: birth windows matching target chart properties.
+
+    search_charts(datetime(1950, 1, 1), datetime(2030, 1, 1),
+                  profile='5/1', hd_type='Projector', gates=[34])
+
+Every activation (13 bodies x personality/design) is a step function of
+birth time, read from the gate/line almanac (hd_almanac). Design steps
+come from the almanac at design time, mapped back to birth time with the
+inverse design offset table. Queries are then interval algebra on
+sorted NumPy arrays:
+
+- profile and gate criteria are unions/intersections of the intervals
+  where single activations take the wanted line or gate;
+- type, authority, definition, channels and centers depend on the whole
+  gate set, so the candidate windows left by the cheap criteria are cut
+  at every gate change, each distinct gate set is analysed once, and the
+  matching segments are merged back into windows.
+"""
+
+import numpy as np
+
+from hd_almanac import LINES_PER_WHEEL, OPPOSITE_LINES, get_almanac
+from hd_bodygraph import (
+    CENTER_BITS, CHANNEL_KEYS, CHANNELS, analyze_channel_mask, channel_mask, gate_mask
+)
+from hd_calculations import (
+    BODY_NAMES, OPPOSITE_BODIES, birth_dates_from_table, datetime_to_julian,
+    design_dates_from_table, julian_to_datetime
+)
+from hd_gates import GATE_ORDER
+
+SIDES = ('personality', 'design')
+
+
+# ============ INTERVAL SETS ============
+# An interval set is a pair of sorted arrays (starts, ends) of disjoint
+# half-open [start, end) intervals.
+
+def _normalize(starts, ends):
+    """Sort, drop empty intervals and merge touching or overlapping ones."""
+    starts = np.asarray(starts, dtype=float)
+    ends = np.asarray(ends, dtype=float)
+    keep = ends > starts
+    starts, ends = starts[keep], ends[keep]
+    if len(starts) == 0:
+        return starts, ends
+    order = np.argsort(starts, kind='stable')
+    starts, ends = starts[order], ends[order]
+    running_end = np.maximum.accumulate(ends)
+    new_group = np.empty(len(starts), dtype=bool)
+    new_group[0] = True
+    new_group[1:] = starts[1:] > running_end[:-1]
+    group = np.cumsum(new_group) - 1
+    merged_ends = np.full(group[-1] + 1, -np.inf)
+    np.maximum.at(merged_ends, group, ends)
+    return starts[new_group], merged_ends
+
+
+def intersect(a, b):
+    """Intersection of two interval sets."""
+    a_starts, a_ends = a
+    b_starts, b_ends = b
+    if len(a_starts) == 0 or len(b_starts) == 0:
+        return np.empty(0), np.empty(0)
+    # Every b interval overlapping a given a interval lies in a contiguous run
+    first = np.searchsorted(b_ends, a_starts, side='right')
+    last = np.searchsorted(b_starts, a_ends, side='left')
+    counts = np.maximum(last - first, 0)
+    a_index = np.repeat(np.arange(len(a_starts)), counts)
+    b_index = np.repeat(first, counts) + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+    starts = np.maximum(a_starts[a_index], b_starts[b_index])
+    ends = np.minimum(a_ends[a_index], b_ends[b_index])
+    return _normalize(starts, ends)
+
+
+def union(*sets):
+    """Union of interval sets."""
+    if not sets:
+        return np.empty(0), np.empty(0)
+    return _normalize(
+        np.concatenate([s[0] for s in sets]),
+        np.concatenate([s[1] for s in sets])
+    )
+
+
+def total_days(interval_set):
+    return float(np.sum(interval_set[1] - interval_set[0]))
+
+
+# ============ ACTIVATION STEP FUNCTIONS ============
+
+class ActivationSteps:
+    """
+    Line index of every activation as a step function of birth JD over
+    [start_jd, end_jd): values[i] holds from breaks[i] to breaks[i + 1].
+    """
+
+    def __init__(self, start_jd, end_jd):
+        self.start_jd = start_jd
+        self.end_jd = end_jd
+        almanac = get_almanac()
+        design_start = design_dates_from_table(start_jd)
+        design_end = design_dates_from_table(end_jd)
+        if np.isnan(design_start) or np.isnan(design_end):
+            raise ValueError("Search range outside the design offset table")
+        if not (almanac.covers(start_jd) and almanac.covers(end_jd) and almanac.covers(design_start)):
+            raise ValueError("Search range outside the gate almanac (design dates included)")
+
+        self.steps = {}
+        for body in BODY_NAMES:
+            source = OPPOSITE_BODIES.get(body, body)
+            shift = OPPOSITE_LINES if source != body else 0
+            jds, lines = almanac.jds[source], almanac.lines[source]
+            for side, lo, hi in (('personality', start_jd, end_jd), ('design', design_start, design_end)):
+                first = np.searchsorted(jds, lo, side='right') - 1
+                last = np.searchsorted(jds, hi, side='left')
+                breaks = jds[first:last].copy()
+                breaks[0] = lo
+                if side == 'design':
+                    breaks = birth_dates_from_table(breaks)
+                    breaks[0] = start_jd
+                values = (lines[first:last] + shift) % LINES_PER_WHEEL
+                self.steps[side, body] = (breaks, values)
+
+    def _ends(self, breaks):
+        return np.append(breaks[1:], self.end_jd)
+
+    def where(self, side, body, mask_fn):
+        """Interval set where mask_fn(line indices) holds for one activation."""
+        breaks, values = self.steps[side, body]
+        mask = mask_fn(values)
+        return _normalize(breaks[mask], self._ends(breaks)[mask])
+
+    def line_intervals(self, side, body, line):
+        return self.where(side, body, lambda values: values % 6 + 1 == line)
+
+    def gate_intervals(self, gate, sides=SIDES):
+        """Interval set where any activation on `sides` is in `gate`."""
+        return union(*[
+            self.where(side, body, lambda values: GATE_ORDER[values // 6] == gate)
+            for side in sides for body in BODY_NAMES
+        ])
+
+    def gate_matrix(self, window):
+        """
+        Cut an interval set at every gate change of any activation.
+
+        Returns (starts, ends, gates) with one row of 26 activation gates
+        per constant-gate segment.
+        """
+        w_starts, w_ends = window
+        cuts = [w_starts]
+        for breaks, values in self.steps.values():
+            gates = GATE_ORDER[values // 6]
+            changes = breaks[1:][gates[1:] != gates[:-1]]
+            index = np.searchsorted(w_starts, changes, side='right') - 1
+            inside = (index >= 0) & (changes < w_ends[np.maximum(index, 0)])
+            cuts.append(changes[inside])
+        starts = np.unique(np.concatenate(cuts))
+        # Each segment ends at the next cut or at the end of its window
+        window_index = np.searchsorted(w_starts, starts, side='right') - 1
+        ends = np.minimum(np.append(starts[1:], np.inf), w_ends[window_index])
+
+        matrix = np.empty((len(starts), len(self.steps)), dtype=np.int8)
+        for col, (breaks, values) in enumerate(self.steps.values()):
+            matrix[:, col] = GATE_ORDER[values[np.searchsorted(breaks, starts, side='right') - 1] // 6]
+        return starts, ends, matrix
+
+
+# ============ CHART-LEVEL PROPERTIES ============
+
+def _matches(gates, criteria):
+    channels = channel_mask(gate_mask(gates))
+    centers, hd_type, authority, definition = analyze_channel_mask(channels)
+    for field, value in (('type', hd_type), ('authority', authority), ('definition', definition)):
+        if criteria.get(field) is not None and value != criteria[field]:
+            return False
+    required_channels = sum(1 << CHANNEL_KEYS.index(key) for key in criteria.get('channels') or ())
+    required_centers = sum(CENTER_BITS[name] for name in criteria.get('centers') or ())
+    return channels & required_channels == required_channels and centers & required_centers == required_centers
+
+
+def _filter_segments(steps, window, criteria):
+    starts, ends, matrix = steps.gate_matrix(window)
+    if len(starts) == 0:
+        return window
+    # Rows are analysed once per distinct gate set
+    sorted_rows = np.sort(matrix, axis=1)
+    unique_rows, inverse = np.unique(sorted_rows, axis=0, return_inverse=True)
+    keep_row = np.array([_matches(row.tolist(), criteria) for row in unique_rows])
+    keep = keep_row[inverse.ravel()]
+    return _normalize(starts[keep], ends[keep])
+
+
+def search_charts(start, end, profile=None, hd_type=None, authority=None, definition=None,
+                  gates=(), channels=(), centers=(), timezone_str='UTC'):
+    """
+    Birth windows in [start, end) whose chart matches every given criterion.
+
+    profile is 'p/d'; gates are activated gates, channels are keys like
+    '34-20' and centers are center names, all required together. Returns
+    a list of dicts with UTC 'start'/'end' datetimes and JDs.
+    """
+    start_jd = datetime_to_julian(start, timezone_str)
+    end_jd = datetime_to_julian(end, timezone_str)
+    steps = ActivationSteps(start_jd, end_jd)
+    window = (np.array([start_jd]), np.array([end_jd]))
+
+    if profile is not None:
+        personality_line, design_line = (int(part) for part in profile.split('/'))
+        window = intersect(window, steps.line_intervals('personality', 'Sun', personality_line))
+        window = intersect(window, steps.line_intervals('design', 'Sun', design_line))
+
+    required_gates = set(gates)
+    for channel in channels:
+        if channel not in CHANNELS:
+            raise ValueError(f"Unknown channel: {channel}")
+        required_gates.update(CHANNELS[channel]['gates'])
+    for gate in sorted(required_gates):
+        window = intersect(window, steps.gate_intervals(gate))
+
+    criteria = {
+        'type': hd_type, 'authority': authority, 'definition': definition,
+        'channels': channels, 'centers': centers
+    }
+    if any(criteria.values()) and len(window[0]):
+        window = _filter_segments(steps, window, criteria)
+
+    return [
+        {
+            'start': julian_to_datetime(jd0),
+            'end': julian_to_datetime(jd1),
+            'start_jd': float(jd0),
+            'end_jd': float(jd1)
+        }
+        for jd0, jd1 in zip(*window)
+    ]
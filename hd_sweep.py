@@ -0,0 +1,242 @@
+"""
+Population statistics over a birth-time grid.
+
+    python hd_sweep.py 1900-01-01 2100-01-01 --step 5 --out sweeps/5min
+
+Sweeps every `step` minutes between two UTC dates and counts type,
+authority, profile, definition, channel frequency and incarnation cross.
+The grid is split into fixed-size chunks that a process pool works
+through independently; each chunk's partial histograms are written to
+its own JSON file in the output directory as soon as it completes, and
+a final merge sums them into histograms.json.
+
+Rerunning the same command resumes: chunks that already have a partial
+file are skipped. The sweep parameters are recorded in sweep.json so a
+resumed run cannot mix grids.
+
+Charts are the array counterparts of calculate_natal_chart and
+analyze_chart: gate/line activations from the almanac (hd_almanac) where
+it covers the chunk, otherwise from the ephemeris backend, analysed with
+analyze_charts_batch.
+"""
+
+import argparse
+import json
+import os
+import sys
+import uuid
+from collections import Counter
+from datetime import datetime
+from multiprocessing import Pool
+
+import numpy as np
+
+from hd_almanac import chart_gates_batch
+from hd_bodygraph import CHANNEL_KEYS, analyze_charts_batch
+from hd_calculations import (
+    BODY_NAMES, calculate_design_dates, datetime_to_julian, design_dates_from_table
+)
+
+# Samples per chunk: about a year of 5-minute births
+CHUNK_SIZE = 100_000
+
+HISTOGRAMS = ('type', 'authority', 'profile', 'definition', 'channel', 'incarnation_cross')
+
+SPEC_FILE = 'sweep.json'
+RESULT_FILE = 'histograms.json'
+
+_SUN = BODY_NAMES.index('Sun')
+_EARTH = BODY_NAMES.index('Earth')
+
+
+def _chunk_path(out_dir, index):
+    return os.path.join(out_dir, f'chunk_{index:06d}.json')
+
+
+def write_json(path, data):
+    """
+    Write JSON atomically: to a temporary name unique to this writer, then
+    renamed over path, so concurrent writers of one path never share a file.
+    """
+    tmp_path = f'{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def sweep_spec(start, end, step_minutes, chunk_size=CHUNK_SIZE):
+    """Grid definition: birth JDs start_jd + k * step for k in [0, count)."""
+    start_jd = datetime_to_julian(start, 'UTC')
+    end_jd = datetime_to_julian(end, 'UTC')
+    step = step_minutes / 1440.0
+    count = int(np.ceil((end_jd - start_jd) / step - 1e-9))
+    if count <= 0:
+        raise ValueError("Sweep must end after it starts")
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'step_minutes': step_minutes,
+        'start_jd': start_jd,
+        'step': step,
+        'count': count,
+        'chunk_size': chunk_size,
+        'chunks': -(-count // chunk_size)
+    }
+
+
+def chunk_jds(spec, index):
+    first = index * spec['chunk_size']
+    last = min(first + spec['chunk_size'], spec['count'])
+    return spec['start_jd'] + spec['step'] * np.arange(first, last)
+
+
+def chart_matrices(birth_jds):
+    """(N, 26) gate and line matrices, personality then design, for birth JDs."""
+    # The offset table is accurate to well under a second, ample for statistics
+    design_jds = design_dates_from_table(birth_jds)
+    outside = np.isnan(design_jds)
+    if outside.any():
+        design_jds[outside] = calculate_design_dates(birth_jds[outside])
+    personality_gates, personality_lines = chart_gates_batch(birth_jds)
+    design_gates, design_lines = chart_gates_batch(design_jds)
+    return (
+        np.hstack([personality_gates, design_gates]),
+        np.hstack([personality_lines, design_lines])
+    )
+
+
+def _counts(values):
+    keys, counts = np.unique(values, return_counts=True)
+    return {str(key): int(count) for key, count in zip(keys, counts)}
+
+
+def chunk_histograms(birth_jds):
+    """Histograms of one chunk of births, as plain dicts of counts."""
+    gates, lines = chart_matrices(birth_jds)
+    analysis = analyze_charts_batch(gates, lines)
+    half = len(BODY_NAMES)
+
+    channel_counts = analysis['defined_channels'].sum(axis=0)
+    # Crosses as 'p_sun/p_earth | d_sun/d_earth', like calculate_incarnation_cross
+    sun_earth = gates[:, [_SUN, _EARTH, half + _SUN, half + _EARTH]].astype(np.int64)
+    cross_codes = sun_earth @ (65 ** np.arange(3, -1, -1))
+    crosses = {}
+    codes, counts = np.unique(cross_codes, return_counts=True)
+    for code, count in zip(codes.tolist(), counts.tolist()):
+        p_sun, p_earth, d_sun, d_earth = code // 65 ** 3, code // 65 ** 2 % 65, code // 65 % 65, code % 65
+        crosses[f"{p_sun}/{p_earth} | {d_sun}/{d_earth}"] = count
+
+    return {
+        'samples': len(birth_jds),
+        'type': _counts(analysis['type']),
+        'authority': _counts(analysis['authority']),
+        'profile': _counts(analysis['profile']),
+        'definition': _counts(analysis['definition']),
+        'channel': {key: int(n) for key, n in zip(CHANNEL_KEYS, channel_counts) if n},
+        'incarnation_cross': crosses
+    }
+
+
+def _run_chunk(task):
+    spec, out_dir, index = task
+    data = chunk_histograms(chunk_jds(spec, index))
+    data['chunk'] = index
+    write_json(_chunk_path(out_dir, index), data)
+    return index, data['samples']
+
+
+def _prepare(out_dir, spec):
+    os.makedirs(out_dir, exist_ok=True)
+    spec_path = os.path.join(out_dir, SPEC_FILE)
+    if os.path.exists(spec_path):
+        with open(spec_path) as f:
+            existing = json.load(f)
+        if existing != json.loads(json.dumps(spec)):
+            raise ValueError(f"{out_dir} holds a sweep with different parameters")
+    else:
+        write_json(spec_path, spec)
+
+
+def pending_chunks(out_dir, spec):
+    return [i for i in range(spec['chunks']) if not os.path.exists(_chunk_path(out_dir, i))]
+
+
+def merge_histograms(parts):
+    """Sum partial histograms (dicts from chunk_histograms) into totals sorted by count."""
+    totals = {name: Counter() for name in HISTOGRAMS}
+    samples = 0
+    for data in parts:
+        samples += data['samples']
+        for name in HISTOGRAMS:
+            totals[name].update(data[name])
+    result = {'samples': samples}
+    for name in HISTOGRAMS:
+        result[name] = dict(totals[name].most_common())
+    return result
+
+
+def _read_chunks(out_dir, spec):
+    for index in range(spec['chunks']):
+        with open(_chunk_path(out_dir, index)) as f:
+            yield json.load(f)
+
+
+def merge_chunks(out_dir, spec):
+    """Sum every chunk's histograms into one result; all chunks must be done."""
+    missing = pending_chunks(out_dir, spec)
+    if missing:
+        raise ValueError(f"{len(missing)} chunks not completed yet")
+    result = {'spec': spec, **merge_histograms(_read_chunks(out_dir, spec))}
+    write_json(os.path.join(out_dir, RESULT_FILE), result)
+    return result
+
+
+def run_sweep(start, end, step_minutes, out_dir, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Sweep [start, end) every step_minutes into out_dir and merge the result.
+
+    Chunks already completed in out_dir are not recomputed. workers
+    defaults to the number of CPUs; 1 runs in this process.
+    """
+    spec = sweep_spec(start, end, step_minutes, chunk_size)
+    _prepare(out_dir, spec)
+    pending = pending_chunks(out_dir, spec)
+    tasks = [(spec, out_dir, index) for index in pending]
+    print(f"{spec['chunks'] - len(pending)}/{spec['chunks']} chunks already done", file=sys.stderr)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        results = map(_run_chunk, tasks)
+        pool = None
+    else:
+        pool = Pool(workers)
+        results = pool.imap_unordered(_run_chunk, tasks)
+    try:
+        for done, (index, samples) in enumerate(results, 1):
+            print(f"chunk {index} ({samples} births) - {done}/{len(tasks)}", file=sys.stderr)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    return merge_chunks(out_dir, spec)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Population statistics over a birth-time grid")
+    parser.add_argument('start', help="start date, YYYY-MM-DD (UTC)")
+    parser.add_argument('end', help="end date, YYYY-MM-DD (UTC, exclusive)")
+    parser.add_argument('--step', type=float, default=5.0, help="grid step in minutes (default 5)")
+    parser.add_argument('--out', required=True, help="output directory for partial and merged histograms")
+    parser.add_argument('--workers', type=int, help="worker processes (default: all CPUs)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="births per chunk")
+    args = parser.parse_args(argv)
+
+    start = datetime.strptime(args.start, '%Y-%m-%d')
+    end = datetime.strptime(args.end, '%Y-%m-%d')
+    result = run_sweep(start, end, args.step, args.out, args.workers, args.chunk_size)
+    print(f"{result['samples']} births -> {os.path.join(args.out, RESULT_FILE)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""
+Tests for hd_geocoding against a local stub backend: no network, no
+cache file, and a fake clock for the rate limiter.
+"""
+
+import pytest
+
+import hd_geocoding
+from hd_geocoding import Geocoder, GeocodeCache, TokenBucket, normalize_location
+
+ATHENS = (37.98, 23.73, 'Athens, Greece')
+
+
+class FakeClock:
+    """Monotonic clock that only moves when sleep() is called."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class StubBackend:
+    """Records queries and answers from a dict; raises on demand."""
+
+    def __init__(self, places=None, clock=None):
+        self.places = places or {}
+        self.clock = clock
+        self.calls = []
+        self.error = None
+
+    def __call__(self, query):
+        self.calls.append((query, self.clock() if self.clock else None))
+        if self.error is not None:
+            raise self.error
+        return self.places.get(query)
+
+
+def make_geocoder(places=None):
+    clock = FakeClock()
+    backend = StubBackend(places, clock)
+    geocoder = Geocoder(
+        backend=backend,
+        cache=GeocodeCache(':memory:'),
+        limiter=TokenBucket(clock=clock, sleep=clock.sleep)
+    )
+    return geocoder, backend, clock
+
+
+def test_normalize_location():
+    assert normalize_location('Athens ,  Greece ') == 'athens, greece'
+    assert normalize_location('athens,greece') == 'athens, greece'
+    assert normalize_location('  ') == ''
+
+
+def test_normalized_key_cache_hit():
+    geocoder, backend, _ = make_geocoder({'Athens , Greece': ATHENS})
+
+    first = geocoder.geocode('Athens , Greece')
+    second = geocoder.geocode('athens,greece')
+
+    assert len(backend.calls) == 1
+    assert first == second
+    assert first['address'] == 'Athens, Greece'
+    assert first['timezone'] == 'Europe/Athens'
+
+
+def test_negative_cache_and_expiry(monkeypatch):
+    geocoder, backend, _ = make_geocoder()
+    now = [1_000_000.0]
+    monkeypatch.setattr(hd_geocoding.time, 'time', lambda: now[0])
+
+    assert geocoder.geocode('Nowhere') is None
+    assert geocoder.geocode('nowhere') is None
+    assert len(backend.calls) == 1
+
+    now[0] += hd_geocoding.NEGATIVE_TTL + 1
+    assert geocoder.geocode('Nowhere') is None
+    assert len(backend.calls) == 2
+
+
+def test_city_fallback_is_cached_under_full_key():
+    geocoder, backend, _ = make_geocoder({'Athens': ATHENS})
+
+    result = geocoder.geocode('Athens, Atlantis')
+
+    assert [query for query, _ in backend.calls] == ['Athens, Atlantis', 'Athens']
+    assert geocoder.geocode('athens, atlantis') == result
+    assert len(backend.calls) == 2
+
+
+def test_transient_errors_are_not_cached():
+    geocoder, backend, _ = make_geocoder({'Athens': ATHENS})
+    backend.error = ConnectionError("network down")
+
+    assert geocoder.geocode('Athens') is None
+
+    backend.error = None
+    assert geocoder.geocode('Athens')['timezone'] == 'Europe/Athens'
+    assert len(backend.calls) == 2
+
+
+def test_backend_calls_are_rate_limited():
+    geocoder, backend, clock = make_geocoder({'Athens': ATHENS, 'Paris': (48.86, 2.35, 'Paris, France')})
+
+    geocoder.geocode('Athens')
+    geocoder.geocode('Paris')
+    geocoder.geocode('Athens')
+
+    times = [at for _, at in backend.calls]
+    assert len(times) == 2
+    assert times[1] - times[0] == pytest.approx(1.0 / hd_geocoding.REQUESTS_PER_SECOND)
+    assert sum(clock.sleeps) == pytest.approx(1.0)
+
+
+def test_token_bucket():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2.0, capacity=2, clock=clock, sleep=clock.sleep)
+
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert not bucket.acquire(timeout=0.1)
+
+    assert bucket.acquire()
+    assert sum(clock.sleeps) == pytest.approx(0.5)